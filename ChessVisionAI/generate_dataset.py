@@ -8,17 +8,16 @@ Usage:
     python generate_dataset.py
 """
 
-from PIL import Image
-from tensorflow.keras.preprocessing.image import (
-    ImageDataGenerator,
-    img_to_array,
-    array_to_img
-)
+from PIL import Image, ImageStat
+from tensorflow.keras.preprocessing.image import ImageDataGenerator
 import numpy as np
+import functools
+import math
 import random
-import uuid
 import os
-from concurrent.futures import ThreadPoolExecutor
+import shutil
+from itertools import count
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 # Config
 base_dir = "data/pieces"
@@ -27,39 +26,94 @@ backgrounds = ["dataset/squares/square_0_1.png", "dataset/squares/square_0_2.png
 training_data_dir = "dataset/training"
 test_data_dir = "dataset/test"
 squares_dir = "dataset/squares"
+cache_dir = "dataset/cache"  # train_model.py's decoded-image cache
 num_images = 10_000  # Images to generate per piece
+# "png" writes one file per image; "npy" writes (N, H, W, 3) uint8 shards
+# that train_model.py memory-maps instead of decoding PNGs every epoch
+output_format = "png"
+shard_size = 1024
+# Pieces are generated by piece_workers processes (one per physical
+# core); each saves PNGs on its share of the cores, so the machine isn't
+# oversubscribed with piece_workers * cpu_count threads
+piece_workers = max(1, (os.cpu_count() or 2) // 2)
+save_threads = max(1, (os.cpu_count() or 1) // piece_workers)
 
 # Create directories
 os.makedirs(training_data_dir, exist_ok=True)
 os.makedirs(test_data_dir, exist_ok=True)
 os.makedirs(squares_dir, exist_ok=True)
 
+# Per-process counter for output filenames; the pid keeps names unique
+# across worker processes
+_file_counter = count()
+
+
+def next_filename(prefix="augmented", ext=".png"):
+    """Return a unique filename for an augmented image."""
+    return f"{prefix}_{os.getpid()}_{next(_file_counter):08x}{ext}"
+
+
+class ShardWriter:
+    """Accumulate uint8 RGB images and write them as .npy shards."""
+
+    def __init__(self, output_dir, size=shard_size):
+        self.output_dir = output_dir
+        self.size = size
+        self.buffer = None
+        self.count = 0
+
+    def add(self, img):
+        if self.buffer is None:
+            self.buffer = np.empty((self.size,) + img.shape, dtype=np.uint8)
+        self.buffer[self.count] = img
+        self.count += 1
+        if self.count == self.size:
+            self.flush()
+
+    def flush(self):
+        if self.count:
+            filename = next_filename("shard", ".npy")
+            np.save(os.path.join(self.output_dir, filename), self.buffer[: self.count])
+            self.count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+
 
 def create_empty_squares():
     """Create empty squares from empty board."""
     print("Creating empty squares from board...")
-    board_image = Image.open(empty_board)
+    board_image = Image.open(empty_board).convert("RGBA")
 
     board_width, board_height = board_image.size
     if board_width != board_height:
         raise ValueError("The board image is not square!")
 
     square_size = board_width // 8
+    board_size = square_size * 8
+
+    # Slice all 64 squares at once as views into a single array:
+    # (8, S, 8, S, C) -> (8, 8, S, S, C) -> (64, S, S, C)
+    arr = np.asarray(board_image)[:board_size, :board_size]
+    tiles = (
+        arr.reshape(8, square_size, 8, square_size, -1)
+        .swapaxes(1, 2)
+        .reshape(64, square_size, square_size, -1)
+    )
 
-    count = 0
-    for row in range(8):
-        for col in range(8):
-            left = col * square_size
-            top = row * square_size
-            right = left + square_size
-            bottom = top + square_size
+    def save_square(i):
+        row, col = divmod(i, 8)
+        square_name = f"square_{row}_{col}.png"
+        Image.fromarray(tiles[i]).save(os.path.join(squares_dir, square_name))
 
-            square_image = board_image.crop((left, top, right, bottom))
-            square_name = f"square_{row}_{col}.png"
-            square_image.save(os.path.join(squares_dir, square_name))
-            count += 1
+    # PNG encoding releases the GIL, so the saves can overlap
+    with ThreadPoolExecutor() as executor:
+        list(executor.map(save_square, range(64)))
 
-    print(f"Empty squares generated: {count}")
+    print(f"Empty squares generated: {len(tiles)}")
 
 
 # Define augmentation generators - GENTLE augmentation to keep pieces complete
@@ -88,43 +142,92 @@ datagen_empty = ImageDataGenerator(
 )
 
 
+@functools.lru_cache(maxsize=16)
+def load_background(bg_path, size):
+    """Decode a background and resize it to `size`, cached per process."""
+    background = Image.open(bg_path).convert("RGBA")
+    return np.asarray(background.resize(size, Image.Resampling.LANCZOS))
+
+
 def add_background(piece_path, background_paths, num_images_per_bg):
-    """Overlay image on background."""
+    """
+    Overlay image on background.
+
+    Returns (images, multipliers): images is a contiguous uint8 array of
+    shape (num_backgrounds, H, W, 3) holding one composite per
+    background, and multipliers[i] says how many samples composite i
+    stands for.
+    """
     piece = Image.open(piece_path).convert("RGBA")
-    images = []
     # Limit to avoid memory issues
     images_per_bg = min(num_images_per_bg, 100)
-    for bg_path in background_paths:
-        background = Image.open(bg_path).convert("RGBA")
-        background = background.resize(piece.size, Image.Resampling.LANCZOS)
-        for _ in range(images_per_bg):
-            combined = Image.alpha_composite(background, piece)
-            images.append(combined)
-    return images
-
-
-def augment_and_save(images, output_path, num_augmented=1000):
-    """Generate and save augmented images for the pieces."""
+    resized_backgrounds = [
+        Image.fromarray(load_background(bg_path, piece.size))
+        for bg_path in background_paths
+    ]
+    width, height = piece.size
+    images = np.empty((len(resized_backgrounds), height, width, 3), dtype=np.uint8)
+    for i, background in enumerate(resized_backgrounds):
+        combined = Image.alpha_composite(background, piece)
+        images[i] = np.asarray(combined.convert("RGB"), dtype=np.uint8)
+    multipliers = [images_per_bg] * len(resized_backgrounds)
+    return images, multipliers
+
+
+def augment_and_save(images, multipliers, output_path, num_augmented=1000, batch_size=64):
+    """
+    Generate and save augmented images for the pieces.
+
+    `images` and `multipliers` are as returned by add_background; each
+    image gets augmentations in proportion to its multiplier.
+    """
     os.makedirs(output_path, exist_ok=True)
-    augmentations_per_image = max(1, num_augmented // len(images)) if images else 0
-    
-    for img in images:
-        x = img_to_array(img)
-        x = x.reshape((1,) + x.shape)
-
-        i = 0
-        for batch in datagen.flow(x, batch_size=1, save_to_dir=None, save_format="png"):
-            augmented_img = batch[0]
-            img_out = array_to_img(augmented_img, scale=True)
-            unique_id = uuid.uuid4().hex
-            filename = f"augmented_{unique_id}.png"
-            img_out.save(os.path.join(output_path, filename))
-            i += 1
-            if i >= augmentations_per_image:
+    keep = [i for i, n in enumerate(multipliers) if n > 0]
+    if not keep:
+        return
+    images = images[keep]
+    multipliers = [multipliers[i] for i in keep]
+    augmentations_per_image = max(1, num_augmented // sum(multipliers))
+    total = augmentations_per_image * sum(multipliers)
+
+    # Draw augmentations in batches from the stacked images rather than
+    # building a one-sample generator per image. Each image is repeated
+    # by its reduced multiplier so that draws stay weighted, and the
+    # stack is tiled up to a full batch. The stack stays uint8 until
+    # datagen.flow casts it for augmentation.
+    step = math.gcd(*multipliers)
+    x = np.repeat(images, [n // step for n in multipliers], axis=0)
+    if len(x) < batch_size:
+        x = np.tile(x, (math.ceil(batch_size / len(x)), 1, 1, 1))
+
+    def save(augmented_img):
+        filename = next_filename()
+        Image.fromarray(augmented_img).save(os.path.join(output_path, filename))
+
+    def batches():
+        saved = 0
+        for batch in datagen.flow(x, batch_size=batch_size, shuffle=True):
+            batch = np.clip(batch[: total - saved], 0, 255).astype(np.uint8)
+            yield batch
+            saved += len(batch)
+            if saved >= total:
                 break
-        
-        # Clear memory
-        del x
+
+    if output_format == "npy":
+        with ShardWriter(output_path) as writer:
+            for batch in batches():
+                for img in batch:
+                    writer.add(img)
+    else:
+        futures = []
+        with ThreadPoolExecutor(max_workers=save_threads) as executor:
+            for batch in batches():
+                futures.extend(executor.submit(save, img) for img in batch)
+            for future in futures:
+                future.result()
+
+    # Clear memory
+    del x
 
 
 def is_valid_image(img):
@@ -133,23 +236,43 @@ def is_valid_image(img):
         return False
     if img.size == (0, 0):
         return False
-    if np.array(img).mean() == 0:
+    if is_all_zero(img):
         return False
     return True
 
 
+def is_all_zero(img):
+    """Check whether every pixel of a PIL image is zero, without copying it."""
+    extrema = img.getextrema()
+    if not isinstance(extrema[0], tuple):  # single-band images
+        extrema = (extrema,)
+    return max(hi for _, hi in extrema) == 0
+
+
+def mean_brightness(img):
+    """Mean over all pixels and bands of a PIL image."""
+    band_means = ImageStat.Stat(img).mean
+    return sum(band_means) / len(band_means)
+
+
 def augment_empty_square(img, num_augmented):
-    """Augment and save empty squares separately."""
+    """
+    Augment an empty square.
+
+    `img` is a uint8 (H, W, C) array so it is cheap to send to a worker
+    process.
+    """
     augmented_images = []
-    x = img_to_array(img)
-    if x.size == 0:
-        print(f"Skipping invalid image with shape: {img.size}")
+    if img.size == 0:
+        print(f"Skipping invalid image with shape: {img.shape}")
         return []
-    x = x.reshape((1,) + x.shape)
+    # datagen_empty.flow casts to float internally; results are cast
+    # straight back so only uint8 arrays are kept and returned
+    x = img[np.newaxis, ...]
 
     for batch in datagen_empty.flow(x, batch_size=1, save_to_dir=None, save_format="png"):
-        augmented_img = batch[0]
-        if np.array(augmented_img).mean() == 0:
+        augmented_img = np.clip(batch[0], 0, 255).astype(np.uint8)
+        if not augmented_img.any():
             continue
         augmented_images.append(augmented_img)
         if len(augmented_images) >= num_augmented:
@@ -184,9 +307,9 @@ def load_and_classify_empty_squares(empty_square_dir):
             unique_squares["left_hedge"].append(empty_image)
         elif row == 7:
             unique_squares["bottom_hedge"].append(empty_image)
-        elif unique_squares["dark_square"] is None and np.array(empty_image).mean() < 127:
+        elif unique_squares["dark_square"] is None and mean_brightness(empty_image) < 127:
             unique_squares["dark_square"] = empty_image
-        elif unique_squares["light_square"] is None and np.array(empty_image).mean() >= 127:
+        elif unique_squares["light_square"] is None and mean_brightness(empty_image) >= 127:
             unique_squares["light_square"] = empty_image
 
     return (
@@ -196,13 +319,26 @@ def load_and_classify_empty_squares(empty_square_dir):
     )
 
 
+def save_augmented(img, output_dir):
+    """Save one augmented uint8 array as a PNG in output_dir."""
+    Image.fromarray(img).save(os.path.join(output_dir, next_filename()))
+
+
 def process_empty_squares(unique_images, output_train_dir, output_test_dir, num_augmented):
-    """Process and save empty square augmentations."""
+    """
+    Process and save empty square augmentations.
+
+    datagen_empty.flow is NumPy/TF work that mostly holds the GIL, so the
+    augmentation runs in worker processes (fed uint8 arrays to keep
+    pickling cheap). PNG encoding in Image.save releases the GIL, so the
+    saves run on a thread pool.
+    """
     all_augmented_images = []
-    with ThreadPoolExecutor() as executor:
+    arrays = [np.asarray(img, dtype=np.uint8) for img in unique_images]
+    with ProcessPoolExecutor() as executor:
         futures = [
-            executor.submit(augment_empty_square, img, num_augmented)
-            for img in unique_images
+            executor.submit(augment_empty_square, x, num_augmented)
+            for x in arrays
         ]
         for future in futures:
             all_augmented_images.extend(future.result())
@@ -213,18 +349,24 @@ def process_empty_squares(unique_images, output_train_dir, output_test_dir, num_
     test_images = all_augmented_images[split_index:]
 
     os.makedirs(output_train_dir, exist_ok=True)
-    for img in train_images:
-        img_out = array_to_img(img, scale=True)
-        unique_id = uuid.uuid4().hex
-        filename = f"augmented_{unique_id}.png"
-        img_out.save(os.path.join(output_train_dir, filename))
-
     os.makedirs(output_test_dir, exist_ok=True)
-    for img in test_images:
-        img_out = array_to_img(img, scale=True)
-        unique_id = uuid.uuid4().hex
-        filename = f"augmented_{unique_id}.png"
-        img_out.save(os.path.join(output_test_dir, filename))
+    if output_format == "npy":
+        for images, output_dir in ((train_images, output_train_dir), (test_images, output_test_dir)):
+            with ShardWriter(output_dir) as writer:
+                for img in images:
+                    writer.add(img[..., :3])
+        return
+
+    with ThreadPoolExecutor() as executor:
+        futures = [
+            executor.submit(save_augmented, img, output_train_dir)
+            for img in train_images
+        ] + [
+            executor.submit(save_augmented, img, output_test_dir)
+            for img in test_images
+        ]
+        for future in futures:
+            future.result()
 
 
 def process_piece(color, filename, backgrounds, num_images, training_data_dir, test_data_dir):
@@ -233,20 +375,19 @@ def process_piece(color, filename, backgrounds, num_images, training_data_dir, t
     piece_path = os.path.join(base_dir, color, filename)
     
     print(f"  Processing {color} {piece_type}...")
-    images = add_background(piece_path, backgrounds, num_images)
+    images, multipliers = add_background(piece_path, backgrounds, num_images)
 
-    random.shuffle(images)
-    split_index = int(len(images) * 0.8)
-    train_images = images[:split_index]
-    test_images = images[split_index:]
+    # Split each composite's multiplier 80/20 between train and test
+    train_multipliers = [int(n * 0.8) for n in multipliers]
+    test_multipliers = [n - t for n, t in zip(multipliers, train_multipliers)]
 
     output_piece_train_dir = os.path.join(training_data_dir, f"{color[0]}_{piece_type}")
     os.makedirs(output_piece_train_dir, exist_ok=True)
-    augment_and_save(train_images, output_piece_train_dir)
+    augment_and_save(images, train_multipliers, output_piece_train_dir)
 
     output_piece_test_dir = os.path.join(test_data_dir, f"{color[0]}_{piece_type}")
     os.makedirs(output_piece_test_dir, exist_ok=True)
-    augment_and_save(test_images, output_piece_test_dir)
+    augment_and_save(images, test_multipliers, output_piece_test_dir)
 
 
 def main():
@@ -254,22 +395,24 @@ def main():
     print("ChessVisionAI Dataset Generator")
     print("=" * 50)
     
+    # The trainer's decoded-image cache would go stale
+    shutil.rmtree(cache_dir, ignore_errors=True)
+
     # Step 1: Create empty squares
     create_empty_squares()
     
-    # Step 2: Generate piece dataset (sequential to avoid memory issues)
+    # Step 2: Generate piece dataset (pieces are independent and
+    # CPU-bound on resampling + PNG encoding; see piece_workers)
     print("\nGenerating piece variations...")
-    for color in ["black", "white"]:
-        color_dir = os.path.join(base_dir, color)
-        for filename in os.listdir(color_dir):
-            process_piece(
-                color,
-                filename,
-                backgrounds,
-                num_images,
-                training_data_dir,
-                test_data_dir,
-            )
+    piece_args = [
+        (color, filename, backgrounds, num_images, training_data_dir, test_data_dir)
+        for color in ["black", "white"]
+        for filename in os.listdir(os.path.join(base_dir, color))
+    ]
+    with ProcessPoolExecutor(max_workers=piece_workers) as executor:
+        futures = [executor.submit(process_piece, *args) for args in piece_args]
+        for future in futures:
+            future.result()
 
     print("Done generating pieces dataset!")
 
@@ -1,14 +1,15 @@
 import tensorflow as tf
 from tensorflow.keras.models import load_model  # type: ignore
-from tensorflow.keras.preprocessing.image import load_img, img_to_array  # type: ignore
 import numpy as np
 import os
+from glob import glob
 from config import img_width, img_height, class_labels
 
 # Define parameters
 model_name = "chess_classifier_10k"
 model_path = f"models/{model_name}.keras"
 tflite_model_path = f"models/{model_name}.tflite"
+tflite_int8_model_path = f"models/{model_name}_int8.tflite"
 
 # Load the saved model from disk
 model = load_model(model_path)
@@ -29,30 +30,28 @@ converter = tf.lite.TFLiteConverter.from_concrete_functions(
 # Generate representative dataset for better quantization
 def representative_dataset_gen():
     sample_images_dir = "dataset/training"
-    for piece_type in class_labels:
-        piece_dir = os.path.join(sample_images_dir, piece_type)
-        filenames = os.listdir(piece_dir)
-        selected_filenames = filenames[
-            :10
-        ]  # Select the first 10 images for each piece type
-
-        for filename in selected_filenames:
-            img_path = os.path.join(piece_dir, filename)
-            img = load_img(
-                img_path, target_size=(img_width, img_height)
-            )  # Adjust target_size if necessary
-            img_array = img_to_array(img)
-            img_array = np.expand_dims(img_array, axis=0)
-            img_array = img_array / 255.0  # Normalize to [0, 1]
-            yield [img_array.astype(np.float32)]
-
-
-if "_quant" in tflite_model_path:
-    converter.optimizations = [tf.lite.Optimize.DEFAULT]
-    converter.representative_dataset = representative_dataset_gen
-    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
-    converter.inference_input_type = tf.uint8  # or tf.int8 ?
-    converter.inference_output_type = tf.uint8  # or tf.int8 ?
+    # Select the first 10 images for each piece type
+    paths = [
+        path
+        for piece_type in class_labels
+        for path in sorted(glob(os.path.join(sample_images_dir, piece_type, "*.png")))[:10]
+    ]
+
+    def load(path):
+        img = tf.image.decode_png(tf.io.read_file(path), channels=3)
+        img = tf.image.resize(img, (img_width, img_height))
+        return img / 255.0  # Normalize to [0, 1]
+
+    # Decode in parallel instead of one load_img call at a time
+    ds = (
+        tf.data.Dataset.from_tensor_slices(paths)
+        .map(load, num_parallel_calls=tf.data.AUTOTUNE)
+        .batch(1)
+        .prefetch(tf.data.AUTOTUNE)
+    )
+    for img_array in ds.as_numpy_iterator():
+        yield [img_array.astype(np.float32)]
+
 
 tflite_model = converter.convert()
 
@@ -60,3 +59,20 @@ with open(tflite_model_path, "wb") as f:
     f.write(tflite_model)
 
 print(f"Model converted to TensorFlow Lite and saved to {tflite_model_path}")
+
+# Full-integer int8 variant: ~4x smaller and typically 2-4x faster on CPU.
+# Load it with tf.lite.Interpreter(model_path=..., num_threads=os.cpu_count());
+# the default CPU path uses XNNPACK. On a Coral Edge TPU pass
+# experimental_delegates=[tf.lite.experimental.load_delegate("libedgetpu.so.1")].
+converter.optimizations = [tf.lite.Optimize.DEFAULT]
+converter.representative_dataset = representative_dataset_gen
+converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+converter.inference_input_type = tf.uint8
+converter.inference_output_type = tf.uint8
+
+tflite_int8_model = converter.convert()
+
+with open(tflite_int8_model_path, "wb") as f:
+    f.write(tflite_int8_model)
+
+print(f"Int8 quantized model saved to {tflite_int8_model_path}")
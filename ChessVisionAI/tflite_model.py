@@ -0,0 +1,82 @@
+"""
+Run the TFLite classifiers written by litify.py.
+
+TFLiteClassifier wraps a tf.lite.Interpreter behind a small model-like
+API: call it with a (N, height, width, 3) uint8 batch of squares and it
+returns (N, num_classes) float32 probabilities, whether the model is the
+float one or the full-integer int8 one.
+"""
+
+import os
+
+import numpy as np
+import tensorflow as tf
+
+
+class TFLiteClassifier:
+    """
+    A TFLite square classifier.
+
+    Parameters:
+    model_path: str
+        Path to a .tflite file produced by litify.py.
+    num_threads: int, optional
+        Interpreter threads; defaults to all cores. The default CPU path
+        runs on XNNPACK.
+    """
+
+    def __init__(self, model_path, num_threads=None):
+        self.model_path = str(model_path)
+        self.interpreter = tf.lite.Interpreter(
+            model_path=self.model_path, num_threads=num_threads or os.cpu_count()
+        )
+        self.interpreter.allocate_tensors()
+        self.input_details = self.interpreter.get_input_details()[0]
+        self.output_details = self.interpreter.get_output_details()[0]
+        self._batch_size = None
+
+    def __call__(self, batch):
+        """
+        Classify a batch of squares.
+
+        Parameters:
+        batch: np.ndarray
+            (N, height, width, 3) uint8 pixels.
+
+        Returns:
+        np.ndarray
+            (N, num_classes) float32 probabilities.
+        """
+        batch = np.asarray(batch)
+        if len(batch) != self._batch_size:
+            # litify.py exports a batch-1 signature; resize it once per
+            # batch size rather than invoking the model square by square.
+            self.interpreter.resize_tensor_input(self.input_details["index"], batch.shape)
+            self.interpreter.allocate_tensors()
+            self._batch_size = len(batch)
+
+        self.interpreter.set_tensor(self.input_details["index"], self._quantize_input(batch))
+        self.interpreter.invoke()
+        return self._dequantize_output(
+            self.interpreter.get_tensor(self.output_details["index"])
+        )
+
+    def _quantize_input(self, batch):
+        dtype = self.input_details["dtype"]
+        if dtype == np.float32:
+            return batch.astype(np.float32) / 255.0
+        # The model was calibrated on [0, 1] inputs; map pixels onto its
+        # quantized input range. With scale 1/255 and zero point 0 this is
+        # the identity, so raw pixels go straight in.
+        scale, zero_point = self.input_details["quantization"]
+        if zero_point == 0 and np.isclose(scale * 255.0, 1.0) and batch.dtype == dtype:
+            return batch
+        info = np.iinfo(dtype)
+        q = np.round(batch.astype(np.float32) / 255.0 / scale + zero_point)
+        return np.clip(q, info.min, info.max).astype(dtype)
+
+    def _dequantize_output(self, output):
+        if output.dtype == np.float32:
+            return output
+        scale, zero_point = self.output_details["quantization"]
+        return (output.astype(np.float32) - zero_point) * scale
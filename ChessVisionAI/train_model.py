@@ -8,9 +8,17 @@ Usage:
 """
 
 import os
-from tensorflow.keras.preprocessing.image import ImageDataGenerator
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras import Sequential, mixed_precision
 from tensorflow.keras.applications import MobileNetV2
-from tensorflow.keras.layers import Dense, GlobalAveragePooling2D
+from tensorflow.keras.layers import (
+    Dense,
+    GlobalAveragePooling2D,
+    RandomBrightness,
+    RandomRotation,
+    RandomZoom,
+)
 from tensorflow.keras.models import Model
 from tensorflow.keras.optimizers import Adam
 from tensorflow.keras.callbacks import EarlyStopping, ModelCheckpoint
@@ -21,6 +29,8 @@ train_data_dir = "dataset/training"
 test_data_dir = "dataset/test"
 wip_models_dir = "models_wip"
 models_dir = "models"
+# Decoded-image cache; generate_dataset.py clears it when regenerating
+cache_dir = "dataset/cache"
 model_name = "chess_classifier_10k"
 current_best = os.path.join(wip_models_dir, f"{model_name}_best.keras")
 final = os.path.join(models_dir, f"{model_name}.keras")
@@ -28,6 +38,122 @@ final = os.path.join(models_dir, f"{model_name}.keras")
 # Parameters
 batch_size = 32
 epochs = 10
+shuffle_buffer = 8192
+
+# Light on-the-fly augmentation, applied after caching so every epoch
+# sees fresh randomness
+augment = Sequential([
+    RandomRotation(5 / 360),
+    RandomZoom(0.1),
+    RandomBrightness(0.2, value_range=(0.0, 1.0)),
+])
+
+
+def list_shards(data_dir):
+    """Return [(shard_path, class_index)] for .npy shards, and the class names."""
+    class_names = sorted(
+        d for d in os.listdir(data_dir) if os.path.isdir(os.path.join(data_dir, d))
+    )
+    shards = [
+        (os.path.join(data_dir, name, f), i)
+        for i, name in enumerate(class_names)
+        for f in sorted(os.listdir(os.path.join(data_dir, name)))
+        if f.endswith(".npy")
+    ]
+    return shards, class_names
+
+
+def load_shards(shards, class_names):
+    """
+    Stream (image, one-hot label) pairs out of memory-mapped .npy shards.
+
+    np.load(mmap_mode="r") hands back views into the files, so nothing
+    is decoded and only the rows being read are paged in.
+    """
+    samples = sum(np.load(path, mmap_mode="r").shape[0] for path, _ in shards)
+    labels = np.eye(len(class_names), dtype=np.float32)
+
+    def generate():
+        for path, class_index in shards:
+            for img in np.load(path, mmap_mode="r"):
+                yield img, labels[class_index]
+
+    ds = tf.data.Dataset.from_generator(
+        generate,
+        output_signature=(
+            tf.TensorSpec((None, None, 3), tf.uint8),
+            tf.TensorSpec((len(class_names),), tf.float32),
+        ),
+    )
+    ds = ds.map(
+        lambda x, y: (tf.image.resize(x, (img_height, img_width)), y),
+        num_parallel_calls=tf.data.AUTOTUNE,
+    )
+    return ds.apply(tf.data.experimental.assert_cardinality(samples)), samples
+
+
+def load_dataset(data_dir, training):
+    """
+    Build a tf.data pipeline over a class-per-folder image directory.
+
+    The folders may hold PNGs or the .npy shards written by
+    generate_dataset.py with output_format = "npy".
+
+    Images are decoded once and cached on disk under cache_dir, then
+    normalized and (for training) shuffled and augmented in parallel.
+    The returned dataset carries `class_names` and `samples` like the
+    old ImageDataGenerator iterators did.
+    """
+    shards, class_names = list_shards(data_dir)
+    if shards:
+        ds, samples = load_shards(shards, class_names)
+    else:
+        ds = tf.keras.utils.image_dataset_from_directory(
+            data_dir,
+            image_size=(img_width, img_height),
+            batch_size=None,
+            label_mode="categorical",
+            shuffle=training,
+        )
+        class_names = ds.class_names
+        samples = len(ds.file_paths)
+
+    # Cache the decoded (not yet normalized or augmented) images as
+    # uint8 on disk: a quarter of the float32 size, reused across epochs
+    # and across runs, while augmentation stays random per epoch.
+    os.makedirs(cache_dir, exist_ok=True)
+    cache_file = os.path.join(cache_dir, os.path.basename(os.path.normpath(data_dir)))
+    ds = ds.map(
+        lambda x, y: (tf.cast(tf.round(x), tf.uint8), y),
+        num_parallel_calls=tf.data.AUTOTUNE,
+    )
+    ds = ds.cache(filename=cache_file)
+
+    ds = ds.map(
+        lambda x, y: (tf.cast(x, tf.float32) / 255.0, y),
+        num_parallel_calls=tf.data.AUTOTUNE,
+    )
+    if training:
+        ds = ds.shuffle(shuffle_buffer)
+    ds = ds.batch(batch_size)
+    if training:
+        ds = ds.map(
+            lambda x, y: (augment(x, training=True), y),
+            num_parallel_calls=tf.data.AUTOTUNE,
+        )
+    ds = ds.prefetch(tf.data.AUTOTUNE)
+
+    ds.class_names = class_names
+    ds.samples = samples
+    return ds
+
+
+def make_optimizer(learning_rate, use_mixed_precision):
+    """Adam, wrapped in a loss-scale optimizer when training in float16."""
+    optimizer = Adam(learning_rate=learning_rate)
+    if use_mixed_precision:
+        optimizer = mixed_precision.LossScaleOptimizer(optimizer)
+    return optimizer
 
 
 def main():
@@ -45,33 +171,25 @@ def main():
         print("Please run generate_dataset.py first.")
         return
 
-    # Data normalization
-    print("\nSetting up data generators...")
-    train_datagen = ImageDataGenerator(rescale=1.0 / 255)
-    test_datagen = ImageDataGenerator(rescale=1.0 / 255)
-
-    # Train and validation generators
-    train_generator = train_datagen.flow_from_directory(
-        train_data_dir,
-        target_size=(img_width, img_height),
-        batch_size=batch_size,
-        class_mode="categorical",
-    )
+    # Input pipelines
+    print("\nSetting up data pipelines...")
+    train_ds = load_dataset(train_data_dir, training=True)
+    validation_ds = load_dataset(test_data_dir, training=False)
 
-    validation_generator = test_datagen.flow_from_directory(
-        test_data_dir,
-        target_size=(img_width, img_height),
-        batch_size=batch_size,
-        class_mode="categorical",
-    )
+    # Calculate steps (len() of a batched dataset is already in batches)
+    steps_per_epoch = len(train_ds)
+    validation_steps = len(validation_ds)
 
-    # Calculate steps
-    steps_per_epoch = max(1, len(train_generator) // batch_size)
-    validation_steps = max(1, len(validation_generator) // batch_size)
+    print(f"\nTraining samples: {train_ds.samples}")
+    print(f"Validation samples: {validation_ds.samples}")
+    print(f"Classes: {train_ds.class_names}")
 
-    print(f"\nTraining samples: {train_generator.samples}")
-    print(f"Validation samples: {validation_generator.samples}")
-    print(f"Classes: {list(train_generator.class_indices.keys())}")
+    # Mixed precision only pays off on GPUs with fp16 tensor cores; on
+    # CPU it would slow training down.
+    use_mixed_precision = bool(tf.config.list_physical_devices("GPU"))
+    if use_mixed_precision:
+        print("\nGPU found, enabling mixed_float16 precision")
+        mixed_precision.set_global_policy("mixed_float16")
 
     # Create model
     print("\nBuilding model (MobileNetV2 + custom layers)...")
@@ -84,7 +202,8 @@ def main():
     x = base_model.output
     x = GlobalAveragePooling2D()(x)
     x = Dense(1024, activation="relu")(x)
-    predictions = Dense(num_classes, activation="softmax")(x)
+    # Keep the output layer in float32 for a numerically stable loss
+    predictions = Dense(num_classes, activation="softmax", dtype="float32")(x)
 
     model = Model(inputs=base_model.input, outputs=predictions)
 
@@ -93,7 +212,7 @@ def main():
         layer.trainable = False
 
     model.compile(
-        optimizer=Adam(learning_rate=0.001),
+        optimizer=make_optimizer(1e-3, use_mixed_precision),
         loss="categorical_crossentropy",
         metrics=["accuracy"],
     )
@@ -112,9 +231,9 @@ def main():
     print("=" * 50)
     
     model.fit(
-        train_generator,
+        train_ds,
         steps_per_epoch=steps_per_epoch,
-        validation_data=validation_generator,
+        validation_data=validation_ds,
         validation_steps=validation_steps,
         epochs=epochs,
         callbacks=[early_stopping, model_checkpoint],
@@ -129,15 +248,15 @@ def main():
         layer.trainable = True
 
     model.compile(
-        optimizer=Adam(learning_rate=1e-5),
+        optimizer=make_optimizer(1e-5, use_mixed_precision),
         loss="categorical_crossentropy",
         metrics=["accuracy"],
     )
 
     model.fit(
-        train_generator,
+        train_ds,
         steps_per_epoch=steps_per_epoch,
-        validation_data=validation_generator,
+        validation_data=validation_ds,
         validation_steps=validation_steps,
         epochs=epochs,
         callbacks=[early_stopping, model_checkpoint],
@@ -149,7 +268,7 @@ def main():
 
     # Evaluate
     print("\nEvaluating model...")
-    loss, accuracy = model.evaluate(validation_generator, steps=validation_steps)
+    loss, accuracy = model.evaluate(validation_ds, steps=validation_steps)
     print(f"\nFinal Test Accuracy: {accuracy:.4f}")
     print(f"Final Test Loss: {loss:.4f}")
 
@@ -1,8 +1,10 @@
+import functools
 import matplotlib.pyplot as plt
-from tensorflow.keras.preprocessing.image import load_img  # type: ignore
+import tensorflow as tf
 from PIL import Image
+import cv2
 import numpy as np
-from config import class_to_fen, img_width, img_height
+from config import class_labels, class_to_fen, img_width, img_height
 
 
 # Visualize the board configuration
@@ -25,42 +27,78 @@ def visualize_board(board_configuration):
     plt.show()
 
 
+# Lookup tables for board_to_fen. class_labels is in sorted (directory)
+# order, so labels can be mapped to class indices with searchsorted.
+CLASS_LABELS = np.array(class_labels)
+FEN_LUT = np.array([class_to_fen[c] for c in class_labels], dtype="U1")
+EMPTY_IDX = class_labels.index("empty")
+
+
 # Function to convert board configuration to FEN
 def board_to_fen(board_configuration):
     """
     Convert the board configuration to FEN notation.
 
     Parameters:
-    board_configuration: list of list of str
+    board_configuration: list of list of str, or np.ndarray of int
         A 2D list representing the board configuration where each element
-        is a string indicating the type of piece on the square.
+        is a string indicating the type of piece on the square, or an
+        8x8 array of class indices into class_labels.
 
     Returns:
     str
         The FEN notation string representing the board configuration.
     """
+    board = np.asarray(board_configuration)
+    if board.dtype.kind in "US":
+        labels = board
+        board = np.searchsorted(CLASS_LABELS, labels).clip(max=len(CLASS_LABELS) - 1)
+        unknown = CLASS_LABELS[board] != labels
+        if unknown.any():
+            raise KeyError(labels[unknown][0])
+
     fen_rows = []
-    for row in board_configuration:
-        fen_row = ""
-        empty_count = 0
-        for square in row:
-            fen_piece = class_to_fen[square]
-            if fen_piece == "1":
-                empty_count += 1
+    for row in board:
+        # Split the row into runs of empty / non-empty squares
+        empty = row == EMPTY_IDX
+        bounds = np.flatnonzero(np.r_[True, empty[1:] != empty[:-1], True])
+        parts = []
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            if empty[start]:
+                parts.append(str(end - start))
             else:
-                if empty_count > 0:
-                    fen_row += str(empty_count)
-                    empty_count = 0
-                fen_row += fen_piece
-        if empty_count > 0:
-            fen_row += str(empty_count)
-        fen_rows.append(fen_row)
+                parts.append("".join(FEN_LUT[row[start:end]]))
+        fen_rows.append("".join(parts))
     fen = "/".join(fen_rows)
     return fen
 
 
+@functools.lru_cache(maxsize=None)
+def fused_preprocess(target_size):
+    """
+    Build an XLA-compiled resize + cast + normalize for one target size.
+
+    The three steps are fused into a single kernel that writes the
+    output once. The size must be a compile-time constant for XLA, hence
+    one compiled function per target size.
+    """
+    width, height = target_size
+
+    @tf.function(
+        input_signature=[tf.TensorSpec([None, None, 3], tf.uint8)],
+        jit_compile=True,
+    )
+    def preprocess(img):
+        # Antialiased bilinear closely matches the quantized path's
+        # cv2.INTER_AREA when downsampling; "area" itself has no XLA kernel
+        img = tf.image.resize(img, (height, width), method="bilinear", antialias=True)
+        return tf.expand_dims(img / 255.0, 0)
+
+    return preprocess
+
+
 def preprocess_image(
-    image, is_quantized_model=False, target_size=(img_width, img_height)
+    image, is_quantized_model=False, target_size=(img_width, img_height), out=None
 ):
     """
     Preprocess the image for model inference.
@@ -74,30 +112,41 @@ def preprocess_image(
         If False, process the image for a non-quantized model.
     target_size: tuple of int
         The target size to resize the image to (width, height).
+    out: np.ndarray, optional
+        A (1, height, width, 3) array to write the result into, so that
+        callers processing many images can reuse one buffer. Must be
+        float32 for non-quantized models and uint8 for quantized ones.
 
     Returns:
     np.ndarray
         The preprocessed image as a numpy array.
     """
     if isinstance(image, str):
-        img = load_img(image, target_size=target_size)
+        img_array = cv2.imread(image, cv2.IMREAD_COLOR)
+        if img_array is None:
+            raise FileNotFoundError(f"Could not read image: {image}")
+        img_array = cv2.cvtColor(img_array, cv2.COLOR_BGR2RGB)
     elif isinstance(image, Image.Image):
-        img = image.convert("RGB")
-        img = img.resize(target_size)
+        img_array = np.asarray(image.convert("RGB"))
     else:
         raise ValueError(
             "The image parameter should be either a file path or a PIL.Image.Image object."
         )
 
-    if not is_quantized_model:
-        img_array = np.array(img, dtype=np.float32)
-        img_array = img_array / 255.0  # Normalize for non-quantized model
-    else:
-        img_array = np.array(img, dtype=np.uint8)  # Use uint8 for quantized model
-
     assert len(img_array.shape) == 3, f"Expected 3D image tensor, got {img_array.shape}"
 
-    # Add batch dimension if necessary
-    img_array = np.expand_dims(img_array, axis=0)
-
-    return img_array
+    if not is_quantized_model:
+        # Resize, cast and normalize in one fused XLA kernel
+        result = fused_preprocess(tuple(target_size))(img_array).numpy()
+        if out is None:
+            return result
+        out[...] = result
+        return out
+
+    # Use uint8 for quantized model
+    width, height = target_size
+    if out is None:
+        # Batch dimension included up front so no extra copy is needed
+        out = np.empty((1, height, width, 3), dtype=np.uint8)
+    out[0] = cv2.resize(img_array, target_size, interpolation=cv2.INTER_AREA)
+    return out
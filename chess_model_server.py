@@ -0,0 +1,179 @@
+"""
+Keep the ChessVisionAI model loaded between conversions.
+
+Importing TensorFlow and loading the model takes a few seconds, which
+dominates converting a single board or chapter. Start a server once:
+
+    python chess_model_server.py --server
+
+and later conversions are sent to it over a Unix socket instead:
+
+    python chess_model_server.py fen path/to/board.png
+    python chess_model_server.py html grooten/text/part0006.html [output.md]
+
+The client side doesn't import TensorFlow. If no server is running the
+conversion is done in-process, as chessvision_to_fen.py and
+html_to_chesser.py would.
+
+The socket and the key clients authenticate with live in a directory
+only the user can access (SERVER_DIR), as requests are pickled.
+"""
+
+from __future__ import annotations
+
+import os
+import stat
+import sys
+import tempfile
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent
+
+# One private (0700) directory per user for the socket and the key, so
+# other users can neither connect nor authenticate.
+SERVER_DIR = os.environ.get("CHESS_MODEL_SERVER_DIR") or os.path.join(
+    tempfile.gettempdir(), f"chess_model_server-{os.getuid()}"
+)
+SERVER_ADDRESS = os.path.join(SERVER_DIR, "server.sock")
+AUTHKEY_PATH = os.path.join(SERVER_DIR, "authkey")
+
+
+def _private_dir(path: str = SERVER_DIR) -> str:
+    """Create `path` as a 0700 directory, refusing one another user owns."""
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid():
+        raise PermissionError(f"{path} is not a directory owned by this user")
+    if stat.S_IMODE(info.st_mode) != 0o700:
+        os.chmod(path, 0o700)
+    return path
+
+
+def _read_authkey(path: str = AUTHKEY_PATH) -> bytes:
+    """The server's key; raises OSError (e.g. FileNotFoundError) if there is none."""
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def convert(kind: str, *args: str) -> str | None:
+    """
+    Run one conversion in this process with the shared model.
+
+    "fen", image_path returns the board's FEN; "html", html_path,
+    output_path writes the chapter's markdown and returns None.
+    """
+    import chessvision_to_fen
+    import html_to_chesser
+
+    model = chessvision_to_fen.load_model()
+    if kind == "fen":
+        return chessvision_to_fen.image_to_fen(Path(args[0]), model)
+    if kind == "html":
+        html_to_chesser.convert_html_to_markdown(Path(args[0]), Path(args[1]), model)
+        return None
+    raise ValueError(f"Unknown conversion: {kind}")
+
+
+def request(kind: str, *args: str | Path, address: str = SERVER_ADDRESS) -> str | None:
+    """
+    Run a conversion (see convert) on the server. Raises OSError if no
+    server is listening, and RuntimeError if the conversion failed.
+    """
+    # The server may run from another directory
+    args = tuple(str(Path(arg).resolve()) for arg in args)
+    try:
+        conn = Client(address, family="AF_UNIX", authkey=_read_authkey())
+    except AuthenticationError as e:
+        # e.g. a key left behind by an earlier server
+        raise PermissionError(f"Model server rejected the key: {e}") from e
+    with conn:
+        conn.send((kind, *args))
+        ok, result = conn.recv()
+    if not ok:
+        raise RuntimeError(result)
+    return result
+
+
+def serve(address: str = SERVER_ADDRESS) -> None:
+    """Load the model and answer conversion requests until interrupted."""
+    import chessvision_to_fen
+
+    print("Loading model...")
+    chessvision_to_fen.load_model()
+
+    _private_dir(os.path.dirname(address))
+    if os.path.exists(address):
+        # Left behind by a server that didn't shut down cleanly
+        os.unlink(address)
+
+    # A fresh key per server; connections that can't prove they read it
+    # are dropped before anything they send is unpickled.
+    authkey = os.urandom(32)
+    # Nothing created below is ever accessible to other users, not even
+    # between creating the socket and the key and restricting them
+    old_umask = os.umask(0o077)
+    try:
+        fd = os.open(AUTHKEY_PATH, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(authkey)
+        listener = Listener(address, family="AF_UNIX", authkey=authkey)
+    finally:
+        os.umask(old_umask)
+
+    with listener:
+        print(f"Listening on {address}")
+        try:
+            while True:
+                try:
+                    conn = listener.accept()
+                except (AuthenticationError, OSError):
+                    continue
+                with conn:
+                    try:
+                        kind, *args = conn.recv()
+                    except EOFError:
+                        continue
+                    try:
+                        reply = (True, convert(kind, *args))
+                    except Exception as e:
+                        reply = (False, f"{type(e).__name__}: {e}")
+                    conn.send(reply)
+        except KeyboardInterrupt:
+            pass
+
+
+def main() -> None:
+    if len(sys.argv) >= 2 and sys.argv[1] == "--server":
+        serve()
+        return
+
+    if len(sys.argv) < 3 or sys.argv[1] not in ("fen", "html"):
+        print("Usage: python chess_model_server.py --server")
+        print("       python chess_model_server.py fen path/to/board.png")
+        print("       python chess_model_server.py html grooten/text/part0006.html [output.md]")
+        sys.exit(1)
+
+    kind, path = sys.argv[1], Path(sys.argv[2])
+    if not path.exists():
+        print(f"Error: File not found: {path}")
+        sys.exit(1)
+    args = [path]
+    if kind == "html":
+        args.append(Path(sys.argv[3]) if len(sys.argv) >= 4 else SCRIPT_DIR / f"{path.stem}.md")
+
+    try:
+        result = request(kind, *args)
+        if kind == "html":
+            print(f"Created: {args[1]}")
+    except OSError:
+        print("No model server running; loading the model here...")
+        result = convert(kind, *map(str, args))
+
+    if kind == "fen":
+        print(f"FEN: {result}")
+
+
+if __name__ == "__main__":
+    main()
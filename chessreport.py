@@ -1,36 +1,184 @@
 import json
 import os
+import re
 import shutil
 import subprocess
-from collections import Counter, defaultdict
+import time
 from datetime import datetime, timezone
+from heapq import nlargest
+from operator import itemgetter
 
 import requests
-from typing import List, Dict, Tuple
-
-from engine_commentary import generate_engine_commentary_for_game
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from typing import Dict, FrozenSet, Iterator, List, Optional, Tuple
+from urllib3.util.retry import Retry
+
+from engine_commentary import (
+    COMMENTARY_VERSION,
+    engine_name,
+    generate_engine_commentary_for_game,
+    generate_engine_commentary_for_games,
+)
+
+# orjson is optional; it parses and serializes games several times faster
+# than the stdlib. Both paths work on bytes.
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+    _json_dumps = orjson.dumps
+except ImportError:
+    _json_loads = json.loads
+
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj).encode("utf-8")
 
 USERNAME = "kinaivan"
 TIME_CONTROL = "900+10"  # 15|10 in chess.com notation
 COMMENTARY_PATH = "/Users/isladonj/Documents/obsidian/obididian-main/Chess/Reports.md"
 GAMES_JSON_PATH = os.path.join(os.path.dirname(__file__), "games.json")
-FULL_REPORT_PATH = "."#"/Users/isladonj/Documents/obsidian/obididian-main/Chess/Full_report.md"
+GAMES_NDJSON_PATH = os.path.splitext(GAMES_JSON_PATH)[0] + ".ndjson"
+ARCHIVE_CACHE_PATH = os.path.join(os.path.dirname(__file__), ".archive_cache.json")
+SUMMARY_STATE_PATH = os.path.join(os.path.dirname(__file__), ".summary_state.json")
+ENGINE_CACHE_PATH = os.path.join(os.path.dirname(__file__), ".engine_cache.json")
+ENGINE_DEPTH = 12
+# Set FULL_REPORT_PATH to <repo>/Full_report.md to write the report in
+# place and skip the copy in copy_and_push_full_report.
+FULL_REPORT_PATH = os.environ.get("FULL_REPORT_PATH") or "."#"/Users/isladonj/Documents/obsidian/obididian-main/Chess/Full_report.md"
 
 # Only consider games from 2026 onward when fetching from the API.
 MIN_2026_END_TIME = int(datetime(2026, 1, 1, tzinfo=timezone.utc).timestamp())
 
 
+def _make_session() -> requests.Session:
+    """Build a pooled, retrying HTTP session for the chess.com API."""
+    session = requests.Session()
+    session.headers.update({"User-Agent": "chess-reporting/1.0 (kinaivan)"})
+    retry = Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=[429, 500, 502, 503, 504],
+    )
+    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16, max_retries=retry)
+    session.mount("https://", adapter)
+    return session
+
+
+_SESSION = _make_session()
+FETCH_WORKERS = 8
+
+
 def fetch_archives(username: str) -> List[str]:
     """Return list of monthly archive URLs for a chess.com user."""
     # I did 'curl https://api.chess.com/pub/player/kinaivan/games/2026/01 | jq '.games[] | select(.time_control == "900+10")' > games.json' to get the games.json file
     url = f"https://api.chess.com/pub/player/{username}/games/archives"
-    headers = {"User-Agent": "chess-reporting/1.0 (kinaivan)"}
-    resp = requests.get(url, headers=headers, timeout=10)
+    resp = _SESSION.get(url, timeout=10)
     resp.raise_for_status()
     data = resp.json()
     return data.get("archives", [])
 
 
+def _load_archive_cache(path: str = ARCHIVE_CACHE_PATH) -> Dict[str, Dict]:
+    """Load the {archive_url: {etag, last_modified, games}} cache, if any."""
+    try:
+        with open(path, "rb") as f:
+            data = _json_loads(f.read())
+    except (FileNotFoundError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _save_archive_cache(cache: Dict[str, Dict], path: str = ARCHIVE_CACHE_PATH) -> None:
+    """Write the archive cache atomically."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_json_dumps(cache))
+    os.replace(tmp_path, path)
+
+
+def _archive_ym(archive_url: str) -> Tuple[int, int]:
+    """Return (year, month) from an archive URL ending in /YYYY/MM."""
+    parts = archive_url.rstrip("/").split("/")
+    return int(parts[-2]), int(parts[-1])
+
+
+def _fetch_archive(archive_url: str, cached: Optional[Dict] = None) -> Optional[Dict]:
+    """
+    Fetch one monthly archive and return a cache entry of the form
+    {"etag": ..., "last_modified": ..., "games": [...]}, where games are
+    its 15|10 games from 2026 onward.
+
+    If a cached entry is given, a conditional GET is sent and the cached
+    entry is returned unchanged on 304 Not Modified. Returns the cached
+    entry (or None) if the fetch fails.
+    """
+    headers = {}
+    if cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    try:
+        resp = _SESSION.get(archive_url, headers=headers, timeout=10)
+        if resp.status_code == 304 and cached:
+            return cached
+        resp.raise_for_status()
+        data = _json_loads(resp.content)
+    except Exception as e:
+        print(f"Failed to fetch archive {archive_url}: {e}")
+        return cached
+
+    games = []
+    for game in data.get("games", []):
+        if game.get("time_control") != TIME_CONTROL:
+            continue
+        end_time = game.get("end_time", 0)
+        # Skip games that finished before 2026.
+        if not isinstance(end_time, int) or end_time < MIN_2026_END_TIME:
+            continue
+        games.append(game)
+
+    return {
+        "etag": resp.headers.get("ETag"),
+        "last_modified": resp.headers.get("Last-Modified"),
+        "games": games,
+    }
+
+
+def _fetch_archives_concurrently(archives: List[str], since_end_time: int = 0) -> List[Dict]:
+    """
+    Fetch several archives at once, returning the games of the month of
+    since_end_time onward in archive order.
+
+    Only whole archives are skipped: games that finished at or before
+    since_end_time can still be new to the caller (e.g. ones chess.com
+    added to a month late), so callers dedup by uuid instead.
+
+    Archives are revalidated against the on-disk cache, so months that
+    have not changed are neither downloaded nor parsed again.
+    """
+    # Archives from months before 2026 or before the cursor's month
+    # cannot hold games we want, so they are never requested.
+    start = datetime.fromtimestamp(max(since_end_time, MIN_2026_END_TIME), tz=timezone.utc)
+    archives = [u for u in archives if _archive_ym(u) >= (start.year, start.month)]
+
+    cache = _load_archive_cache()
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as executor:
+        entries = list(executor.map(lambda url: _fetch_archive(url, cache.get(url)), archives))
+
+    games: List[Dict] = []
+    for archive_url, entry in zip(archives, entries):
+        if entry is None:
+            continue
+        cache[archive_url] = entry
+        games.extend(entry["games"])
+
+    _save_archive_cache(cache)
+    return games
+
+
 def fetch_15_10_games(username: str) -> List[Dict]:
     """
     Fetch all games for the user and filter to 15|10 time control.
@@ -38,30 +186,123 @@ def fetch_15_10_games(username: str) -> List[Dict]:
     Returns a list of game dicts from chess.com API.
     """
     archives = fetch_archives(username)
-    games_15_10 = []
+    return _fetch_archives_concurrently(archives)
 
-    for archive_url in archives:
-        try:
-            headers = {
-                "User-Agent": "chess-reporting/1.0 (kinaivan)"
-            }
-            resp = requests.get(archive_url, headers=headers, timeout=10)
-            resp.raise_for_status()
-            data = resp.json()
-        except Exception as e:
-            print(f"Failed to fetch archive {archive_url}: {e}")
-            continue
 
-        for game in data.get("games", []):
-            if game.get("time_control") != TIME_CONTROL:
-                continue
-            end_time = game.get("end_time", 0)
-            # Skip games that finished before 2026.
-            if not isinstance(end_time, int) or end_time < MIN_2026_END_TIME:
-                continue
-            games_15_10.append(game)
+def ndjson_path_for(json_path: str) -> str:
+    """Return the NDJSON store that sits next to a games JSON file."""
+    return os.path.splitext(json_path)[0] + ".ndjson"
+
+
+def pgn_path_for(json_path: str) -> str:
+    """Return the full-PGN sidecar that sits next to a games JSON file."""
+    return os.path.splitext(json_path)[0] + ".pgn.ndjson"
+
+
+def uuids_path_for(json_path: str) -> str:
+    """Return the stored-uuids sidecar that sits next to a games JSON file."""
+    return os.path.splitext(json_path)[0] + ".uuids"
+
+
+# Top-level fields the reports read; everything else chess.com sends is
+# dropped before games are stored.
+_SLIM_FIELDS = ("uuid", "url", "end_time", "time_control", "white", "black", "eco")
+
+
+def _slim_game(game: Dict) -> Dict:
+    """
+    Return the stored view of a game: the fields the reports use, with
+    the PGN cut down to its header tags. The moves, only needed for
+    engine commentary, go to the PGN sidecar instead.
+    """
+    slim = {k: game[k] for k in _SLIM_FIELDS if k in game}
+    pgn = game.get("pgn")
+    if pgn:
+        slim["pgn"] = pgn.split("\n\n", 1)[0]
+    return slim
+
+
+def _write_games(games_file, pgn_file, games: List[Dict]) -> None:
+    """Write games to the store and their full PGNs to the sidecar."""
+    for game in games:
+        games_file.write(_json_dumps(_slim_game(game)) + b"\n")
+        if game.get("uuid") and game.get("pgn"):
+            pgn_file.write(_json_dumps({"uuid": game["uuid"], "pgn": game["pgn"]}) + b"\n")
+
+
+# {uuid: full PGN} keyed by (path, mtime_ns, size) of the sidecar.
+_PGN_CACHE: Dict[Tuple[str, int, int], Dict[str, str]] = {}
+
 
-    return games_15_10
+def with_full_pgn(game: Dict, json_path: str = GAMES_JSON_PATH) -> Dict:
+    """
+    Return the game with its full PGN restored from the sidecar, for
+    engine analysis. The sidecar is only read the first time this is
+    needed in a run.
+    """
+    pgn = game.get("pgn") or ""
+    uuid = game.get("uuid")
+    if not uuid or "\n\n" in pgn:
+        # Already a full PGN (e.g. stored before games were slimmed).
+        return game
+
+    path = pgn_path_for(json_path)
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return game
+    key = (path, st.st_mtime_ns, st.st_size)
+    pgns = _PGN_CACHE.get(key)
+    if pgns is None:
+        pgns = {entry["uuid"]: entry["pgn"] for entry in iter_games_ndjson(path)}
+        _PGN_CACHE[key] = pgns
+
+    full_pgn = pgns.get(uuid)
+    return {**game, "pgn": full_pgn} if full_pgn else game
+
+
+def iter_games_ndjson(path: str = GAMES_NDJSON_PATH) -> Iterator[Dict]:
+    """Yield games one at a time from a newline-delimited JSON file."""
+    with open(path, "rb") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield _json_loads(line)
+
+
+def migrate_games_json_to_ndjson(
+    json_path: str = GAMES_JSON_PATH,
+    ndjson_path: Optional[str] = None,
+) -> int:
+    """
+    One-shot conversion of a games JSON list into the NDJSON store.
+
+    Games are stored slimmed, with their full PGNs in the sidecar (see
+    _slim_game). Returns the number of games written.
+    """
+    ndjson_path = ndjson_path or ndjson_path_for(json_path)
+    with open(json_path, "rb") as f:
+        data = _json_loads(f.read())
+    if not isinstance(data, list):
+        raise ValueError(f"Games file at {json_path} is not a list; got {type(data)} instead.")
+
+    pgn_path = pgn_path_for(ndjson_path)
+    tmp_path = ndjson_path + ".tmp"
+    pgn_tmp_path = pgn_path + ".tmp"
+    with open(tmp_path, "wb") as f, open(pgn_tmp_path, "wb") as pgn_f:
+        _write_games(f, pgn_f, data)
+    os.replace(pgn_tmp_path, pgn_path)
+    os.replace(tmp_path, ndjson_path)
+    # Rebuilt from the new store on the next update
+    try:
+        os.remove(uuids_path_for(ndjson_path))
+    except FileNotFoundError:
+        pass
+    return len(data)
+
+
+# Parsed games keyed by (path, mtime_ns, size) of the file they came from.
+_GAMES_CACHE: Dict[Tuple[str, int, int], List[Dict]] = {}
 
 
 def load_games_from_file(path: str = GAMES_JSON_PATH) -> List[Dict]:
@@ -69,15 +310,38 @@ def load_games_from_file(path: str = GAMES_JSON_PATH) -> List[Dict]:
     Load games from a local JSON file instead of querying the API.
 
     The file is expected to contain a list of game dicts in the same
-    format as returned by the chess.com API.
+    format as returned by the chess.com API. If the NDJSON store next to
+    it exists (see update_games_json), that is read instead, since it is
+    the one kept up to date.
+
+    Results are memoized on the file's path, mtime and size, so repeat
+    calls in one run only parse the file once. Treat the returned list
+    as read-only.
     """
+    ndjson_path = ndjson_path_for(path)
+    source = ndjson_path if os.path.exists(ndjson_path) else path
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        st = os.stat(source)
     except FileNotFoundError:
         print(f"Games file not found at: {path}")
         return []
 
+    key = (source, st.st_mtime_ns, st.st_size)
+    games = _GAMES_CACHE.get(key)
+    if games is None:
+        games = _read_games_file(source)
+        _GAMES_CACHE[key] = games
+    return games
+
+
+def _read_games_file(path: str) -> List[Dict]:
+    """Parse a games JSON list or NDJSON file, keeping only 15|10 games."""
+    if path.endswith(".ndjson"):
+        data = list(iter_games_ndjson(path))
+    else:
+        with open(path, "rb") as f:
+            data = _json_loads(f.read())
+
     if not isinstance(data, list):
         print(f"Games file at {path} is not a list; got {type(data)} instead.")
         return []
@@ -117,6 +381,60 @@ def normalize_result(raw_result: str) -> str:
     return raw_result or "unknown"
 
 
+# Index of each counted result in the summary's [wins, draws, losses] lists.
+_RESULT_ID = {"win": 0, "draw": 1, "loss": 2}
+_NO_RESULTS = (0, 0, 0)
+
+
+def _identify_player(
+    game: Dict, username_lower: str
+) -> Optional[Tuple[Dict, Dict, str]]:
+    """
+    Return (player, opponent, player_color) for the user in a game, or
+    None if the user is not one of its players. username_lower must
+    already be lowercased.
+    """
+    white = game.get("white") or {}
+    black = game.get("black") or {}
+    name = white.get("username")
+    if name is not None and str(name).lower() == username_lower:
+        return white, black, "white"
+    name = black.get("username")
+    if name is not None and str(name).lower() == username_lower:
+        return black, white, "black"
+    return None
+
+
+# PGN header tags we read. Headers always sit at the top of the PGN, so
+# only its first few KB are scanned.
+_PGN_TAG_RE = re.compile(
+    r'^\s*\[(UTCDate|Date|Opening|ECOUrl|Link)\s+"([^"]*)"\]', re.MULTILINE
+)
+_PGN_HEADER_BYTES = 4096
+_DATE_TAGS = frozenset({"UTCDate", "Date"})
+_OPENING_TAGS = frozenset({"Opening", "ECOUrl"})
+_LINK_TAGS = frozenset({"Link"})
+
+
+def _extract_pgn_tags(pgn: str, wanted: FrozenSet[str]) -> Dict[str, str]:
+    """
+    Return {tag: value} for the wanted header tags found in a PGN,
+    stopping as soon as all of them have been seen.
+    """
+    tags: Dict[str, str] = {}
+    for match in _PGN_TAG_RE.finditer(pgn, 0, _PGN_HEADER_BYTES):
+        name = match.group(1)
+        if name in wanted and name not in tags:
+            tags[name] = match.group(2).strip()
+            if len(tags) == len(wanted):
+                break
+    return tags
+
+
+# UTC day number (end_time // 86400) -> "YYYY-MM-DD"; many games share a day.
+_DATE_CACHE: Dict[int, str] = {}
+
+
 def get_game_date(game: Dict) -> str:
     """
     Derive a human-readable game date (YYYY-MM-DD).
@@ -126,27 +444,21 @@ def get_game_date(game: Dict) -> str:
     """
     end_time = game.get("end_time")
     if isinstance(end_time, int) and end_time > 0:
+        day = end_time // 86400
+        date_str = _DATE_CACHE.get(day)
+        if date_str is not None:
+            return date_str
         try:
-            dt = datetime.fromtimestamp(end_time, tz=timezone.utc)
-            return dt.date().isoformat()
-        except Exception:
+            tm = time.gmtime(end_time)
+        except (OverflowError, OSError, ValueError):
             pass
+        else:
+            date_str = "%04d-%02d-%02d" % (tm.tm_year, tm.tm_mon, tm.tm_mday)
+            _DATE_CACHE[day] = date_str
+            return date_str
 
-    pgn_text = str(game.get("pgn", ""))
-    utc_date = ""
-    date_tag = ""
-    for line in pgn_text.splitlines():
-        line = line.strip()
-        if line.startswith("[UTCDate "):
-            parts = line.split('"')
-            if len(parts) >= 2:
-                utc_date = parts[1].strip()
-        if line.startswith("[Date "):
-            parts = line.split('"')
-            if len(parts) >= 2:
-                date_tag = parts[1].strip()
-
-    date_str = utc_date or date_tag
+    tags = _extract_pgn_tags(str(game.get("pgn", "")), _DATE_TAGS)
+    date_str = tags.get("UTCDate") or tags.get("Date")
     if date_str and date_str != "????.??.??":
         # PGN dates are usually in YYYY.MM.DD
         return date_str.replace(".", "-")
@@ -154,10 +466,29 @@ def get_game_date(game: Dict) -> str:
     return "Unknown"
 
 
+# Opening names keyed by the game's chess.com uuid.
+_OPENING_CACHE: Dict[str, str] = {}
+
+
 def get_opening_name(game: Dict) -> str:
     """
     Derive a human-readable opening name for a game.
 
+    Results are memoized per game uuid, since both the per-game report
+    and the summary ask for every game's opening.
+    """
+    uuid = game.get("uuid")
+    if not uuid:
+        return _derive_opening_name(game)
+    name = _OPENING_CACHE.get(uuid)
+    if name is None:
+        name = _derive_opening_name(game)
+        _OPENING_CACHE[uuid] = name
+    return name
+
+
+def _derive_opening_name(game: Dict) -> str:
+    """
     Prefer the 'eco' URL field from the JSON (which points to the
     chess.com opening page). If that is missing, fall back to parsing
     ECOUrl or Opening tags from the PGN.
@@ -168,148 +499,256 @@ def get_opening_name(game: Dict) -> str:
         if slug:
             return slug.replace("-", " ")
 
-    pgn_text = str(game.get("pgn", ""))
-    for line in pgn_text.splitlines():
-        line = line.strip()
-        if line.startswith("[Opening "):
-            parts = line.split('"')
-            if len(parts) >= 2:
-                name = parts[1].strip()
-                if name:
-                    return name
-        if line.startswith("[ECOUrl "):
-            parts = line.split('"')
-            if len(parts) >= 2:
-                url = parts[1].strip()
-                slug = url.rstrip("/").split("/")[-1]
-                if slug:
-                    return slug.replace("-", " ")
+    tags = _extract_pgn_tags(str(game.get("pgn", "")), _OPENING_TAGS)
+    name = tags.get("Opening")
+    if name:
+        return name
+    slug = tags.get("ECOUrl", "").rstrip("/").split("/")[-1]
+    if slug:
+        return slug.replace("-", " ")
 
     return "Unknown"
 
 
 def fetch_15_10_games_since(username: str, since_end_time: int) -> List[Dict]:
     """
-    Fetch 15|10 games from the API that finished after since_end_time.
+    Fetch 15|10 games from the API from the month of since_end_time
+    onward.
 
-    This is intended for updating games.json with only new games.
+    This is intended for updating games.json with only new games; the
+    caller drops the ones it already has by uuid.
     """
     archives = fetch_archives(username)
-    new_games: List[Dict] = []
-
-    for archive_url in archives:
-        try:
-            headers = {"User-Agent": "chess-reporting/1.0 (kinaivan)"}
-            resp = requests.get(archive_url, headers=headers, timeout=10)
-            resp.raise_for_status()
-            data = resp.json()
-        except Exception as e:
-            print(f"Failed to fetch archive {archive_url}: {e}")
-            continue
-
-        for game in data.get("games", []):
-            if game.get("time_control") != TIME_CONTROL:
-                continue
-            end_time = game.get("end_time", 0)
-            if not isinstance(end_time, int):
-                continue
-            # Only consider games from 2026 onward and newer than the last
-            # recorded end_time we already have.
-            if end_time < MIN_2026_END_TIME or end_time <= since_end_time:
-                continue
-            new_games.append(game)
+    new_games = _fetch_archives_concurrently(archives, since_end_time)
 
     # Keep games in chronological order by end_time
     new_games.sort(key=lambda g: g.get("end_time", 0))
     return new_games
 
 
+def _load_stored_uuids(ndjson_path: str) -> Dict[str, int]:
+    """
+    Return {uuid: end_time} for the games in the NDJSON store.
+
+    They are read from the uuids sidecar, one "uuid<TAB>end_time" line
+    per game, so the store itself is not parsed. If there is no sidecar
+    yet it is built from the store once.
+    """
+    uuids: Dict[str, int] = {}
+    if not os.path.exists(ndjson_path):
+        return uuids
+    uuids_path = uuids_path_for(ndjson_path)
+    try:
+        with open(uuids_path, "r", encoding="utf-8") as f:
+            for line in f:
+                uuid, _, end_time = line.rstrip("\n").partition("\t")
+                if uuid:
+                    uuids[uuid] = int(end_time or 0)
+        return uuids
+    except FileNotFoundError:
+        pass
+
+    for game in iter_games_ndjson(ndjson_path):
+        uuid = game.get("uuid")
+        if uuid and game.get("time_control") == TIME_CONTROL:
+            end_time = game.get("end_time", 0)
+            uuids[uuid] = end_time if isinstance(end_time, int) else 0
+
+    tmp_path = uuids_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.writelines(f"{uuid}\t{end_time}\n" for uuid, end_time in uuids.items())
+    os.replace(tmp_path, uuids_path)
+    return uuids
+
+
 def update_games_json(username: str, json_path: str = GAMES_JSON_PATH) -> Tuple[int, int]:
     """
-    Read games from json_path, fetch any newer 15|10 games from the API,
-    append them, and write back to json_path.
+    Fetch any newer 15|10 games from the API and append them to the
+    NDJSON store next to json_path (migrating json_path into it first
+    if needed).
+
+    Only the new games are written: the file is opened in append mode
+    and each game is one line, so existing games are never rewritten.
+    Every game of the months since the latest stored one is fetched and
+    those whose uuid is already stored are skipped, so neither late
+    additions nor games sharing the latest end_time are lost, and none
+    are duplicated. The stored uuids are kept in an append-only sidecar
+    (see _load_stored_uuids). Games are stored slimmed, with their full
+    PGNs appended to the PGN sidecar (see _slim_game).
 
     Returns a tuple: (number of new games appended, number of games that
     were already present before the update).
     """
-    existing_games = load_games_from_file(json_path)
-    previous_count = len(existing_games)
-    if existing_games:
-        latest_end_time = max(
-            (g.get("end_time", 0) for g in existing_games if isinstance(g.get("end_time", 0), int)),
-            default=0,
-        )
-    else:
-        latest_end_time = 0
-
-    print(f"Latest recorded end_time in {json_path}: {latest_end_time}")
-
-    new_games = fetch_15_10_games_since(username, latest_end_time)
+    ndjson_path = ndjson_path_for(json_path)
+    if not os.path.exists(ndjson_path) and os.path.exists(json_path):
+        migrated = migrate_games_json_to_ndjson(json_path, ndjson_path)
+        print(f"Migrated {migrated} games from {json_path} to {ndjson_path}.")
+
+    known_uuids = _load_stored_uuids(ndjson_path)
+    previous_count = len(known_uuids)
+    latest_end_time = max(known_uuids.values(), default=0)
+
+    print(f"Latest recorded end_time in {ndjson_path}: {latest_end_time}")
+
+    new_games = []
+    for game in fetch_15_10_games_since(username, latest_end_time):
+        uuid = game.get("uuid")
+        if uuid:
+            if uuid in known_uuids:
+                continue
+            known_uuids[uuid] = game["end_time"]
+        new_games.append(game)
     if not new_games:
         print("No new 15|10 games found to append.")
         return 0, previous_count
 
-    updated_games = existing_games + new_games
-
-    with open(json_path, "w", encoding="utf-8") as f:
-        json.dump(updated_games, f, indent=2)
+    with open(ndjson_path, "ab", buffering=1 << 20) as f, \
+            open(pgn_path_for(ndjson_path), "ab", buffering=1 << 20) as pgn_f:
+        _write_games(f, pgn_f, new_games)
+    # After the store, so a uuid is never recorded for a game it lacks
+    with open(uuids_path_for(ndjson_path), "a", encoding="utf-8") as f:
+        f.writelines(f"{g['uuid']}\t{g['end_time']}\n" for g in new_games if g.get("uuid"))
 
-    print(f"Appended {len(new_games)} new games to {json_path}. Total games: {len(updated_games)}.")
+    print(
+        f"Appended {len(new_games)} new games to {ndjson_path}. "
+        f"Total games: {previous_count + len(new_games)}."
+    )
     return len(new_games), previous_count
 
 
+def _load_engine_cache(path: str = ENGINE_CACHE_PATH) -> Dict[str, str]:
+    """Load the {"uuid|depth": commentary} engine cache, if any."""
+    try:
+        with open(path, "rb") as f:
+            data = _json_loads(f.read())
+    except (FileNotFoundError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _save_engine_cache(cache: Dict[str, str], path: str = ENGINE_CACHE_PATH) -> None:
+    """Write the engine cache atomically."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_json_dumps(cache))
+    os.replace(tmp_path, path)
+
+
+def engine_commentaries_for(
+    games: List[Dict], username: str, depth: int = ENGINE_DEPTH
+) -> Dict[str, str]:
+    """
+    Return {uuid: engine commentary} for the given games.
+
+    Results are cached on disk per game uuid, depth, engine and
+    COMMENTARY_VERSION, so only games never analysed that way before
+    reach the engine, and those share a single engine process.
+    """
+    name = engine_name()
+    if name is None:
+        return {}
+
+    def key(uuid: str) -> str:
+        return f"{uuid}|{depth}|{name}|v{COMMENTARY_VERSION}"
+
+    cache = _load_engine_cache()
+    missing = [
+        with_full_pgn(g) for g in games
+        if g.get("uuid") and key(g["uuid"]) not in cache
+    ]
+    if missing:
+        fresh = generate_engine_commentary_for_games(missing, username, depth=depth)
+        if fresh:
+            cache.update((key(uuid), c) for uuid, c in fresh.items())
+            _save_engine_cache(cache)
+
+    result: Dict[str, str] = {}
+    for g in games:
+        uuid = g.get("uuid")
+        commentary = cache.get(key(uuid)) if uuid else None
+        if commentary:
+            result[uuid] = commentary
+    return result
+
+
 def build_markdown_report(
     username: str,
     start_at_game_index: int = 0,
     include_header: bool = True,
+    games: Optional[List[Dict]] = None,
 ) -> str:
     """
-    Build a markdown report of games with commentary.
+    Build a markdown report of games with commentary as one string.
+
+    See iter_markdown_report for the arguments.
+    """
+    return "".join(iter_markdown_report(
+        username,
+        start_at_game_index=start_at_game_index,
+        include_header=include_header,
+        games=games,
+    ))
+
+
+def iter_markdown_report(
+    username: str,
+    start_at_game_index: int = 0,
+    include_header: bool = True,
+    games: Optional[List[Dict]] = None,
+) -> Iterator[str]:
+    """
+    Yield a markdown report of games with commentary, one line (with its
+    trailing newline) at a time, so it can be written out as it is
+    generated.
 
     If start_at_game_index > 0, only games from that index onward are
     printed, but commentary indexing is still based on the full list of
     games so that existing commentary for older games is left unchanged
     and new commentary lines can be appended for newly fetched games.
+
+    Pass `games` to reuse an already loaded list; otherwise it is read
+    from games.json.
     """
     # Read games locally from games.json instead of querying the API.
-    games = load_games_from_file(GAMES_JSON_PATH)
+    if games is None:
+        games = load_games_from_file(GAMES_JSON_PATH)
     commentaries = load_commentary_lines(COMMENTARY_PATH)
 
     if not games:
-        return f"No 15|10 games found for user '{username}'.\n"
+        yield f"No 15|10 games found for user '{username}'.\n"
+        return
 
-    lines: List[str] = []
     if include_header:
-        lines.append(f"# Chess report for {username}")
+        yield f"# Chess report for {username}\n"
 
         if start_at_game_index <= 0:
-            lines.append("")
-            lines.append(f"Total 15|10 games: {len(games)}")
+            yield "\n"
+            yield f"Total 15|10 games: {len(games)}\n"
         else:
-            lines.append("")
-            lines.append(
+            yield "\n"
+            yield (
                 f"Total 15|10 games: {len(games)} "
-                f"(showing newly fetched games from #{start_at_game_index + 1} onward)"
+                f"(showing newly fetched games from #{start_at_game_index + 1} onward)\n"
             )
 
+    # Analyse every game without written commentary up front, so they
+    # share one engine process and reuse cached results.
+    engine_commentaries = engine_commentaries_for(
+        [
+            game
+            for idx, game in enumerate(games[start_at_game_index:], start=start_at_game_index)
+            if not (idx < len(commentaries) and commentaries[idx])
+        ],
+        username,
+    )
+
+    username_lower = username.lower()
     for idx, game in enumerate(games[start_at_game_index:], start=start_at_game_index):
-        white = game.get("white", {})
-        black = game.get("black", {})
-
-        white_name = white.get("username", "").lower()
-        black_name = black.get("username", "").lower()
-
-        if white_name == username.lower():
-            player_color = "white"
-            opponent = black
-        elif black_name == username.lower():
-            player_color = "black"
-            opponent = white
-        else:
+        identified = _identify_player(game, username_lower)
+        if identified is None:
             # Skip games where the user is not one of the players (shouldn't happen)
             continue
-
-        player = white if player_color == "white" else black
+        player, opponent, _ = identified
 
         opponent_name = opponent.get("username", "Unknown")
         player_rating = player.get("rating", "N/A")
@@ -324,42 +763,36 @@ def build_markdown_report(
         game_url = game.get("url", "")
         if not game_url:
             # Fallback: try to parse the Link tag from the PGN if present.
-            pgn_text = game.get("pgn", "")
-            for line in pgn_text.splitlines():
-                line = line.strip()
-                if line.startswith("[Link "):
-                    # Format: [Link "https://..."]
-                    parts = line.split('"')
-                    if len(parts) >= 2:
-                        game_url = parts[1]
-                    break
+            tags = _extract_pgn_tags(str(game.get("pgn", "")), _LINK_TAGS)
+            game_url = tags.get("Link", "")
 
         opening_name = get_opening_name(game)
 
         # Prefer manually written commentary lines if present. If there is
-        # no existing commentary for this game, try to generate a short
-        # explanation using the engine instead.
+        # no existing commentary for this game, use a short explanation
+        # generated by the engine instead.
         commentary = commentaries[idx] if idx < len(commentaries) else ""
         if not commentary:
-            commentary = generate_engine_commentary_for_game(game, username)
-
-        lines.append("")
-        lines.append(f"## Game {idx + 1}")
-        lines.append(f"- **Opponent**: {opponent_name}")
-        lines.append(f"- **Ratings**: {username} ({player_rating}) vs {opponent_name} ({opponent_rating})")
-        lines.append(f"- **Result for {username}**: {result_simple}")
-        lines.append(f"- **Date**: {game_date}")
-        lines.append(f"- **Opening**: {opening_name}")
+            if game.get("uuid"):
+                commentary = engine_commentaries.get(game["uuid"], "")
+            else:
+                commentary = generate_engine_commentary_for_game(
+                    with_full_pgn(game), username, depth=ENGINE_DEPTH
+                )
+
+        yield "\n"
+        yield f"## Game {idx + 1}\n"
+        yield f"- **Opponent**: {opponent_name}\n"
+        yield f"- **Ratings**: {username} ({player_rating}) vs {opponent_name} ({opponent_rating})\n"
+        yield f"- **Result for {username}**: {result_simple}\n"
+        yield f"- **Date**: {game_date}\n"
+        yield f"- **Opening**: {opening_name}\n"
         if game_url:
-            lines.append(f"- **Game link**: [{game_url}]({game_url})")
+            yield f"- **Game link**: [{game_url}]({game_url})\n"
         if commentary:
-            lines.append(f"- **Commentary**: {commentary}")
+            yield f"- **Commentary**: {commentary}\n"
         else:
-            lines.append(f"- **Commentary**: (none)")
-
-    if include_header:
-        lines.append("")
-    return "\n".join(lines)
+            yield f"- **Commentary**: (none)\n"
 
 
 def print_games_with_commentary(username: str, start_at_game_index: int = 0) -> None:
@@ -370,151 +803,259 @@ def print_games_with_commentary(username: str, start_at_game_index: int = 0) ->
     print(report)
 
 
+def _report_count_path(report_path: str) -> str:
+    """Sidecar file recording how many games a report holds."""
+    return report_path + ".count"
+
+
+def _save_report_count(report_path: str, count: int) -> None:
+    """
+    Record the game count for the report as it is now, tagged with the
+    report's size and mtime so a later edit invalidates it.
+    """
+    st = os.stat(report_path)
+    count_path = _report_count_path(report_path)
+    tmp_path = count_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"count": count, "size": st.st_size, "mtime_ns": st.st_mtime_ns}, f)
+    os.replace(tmp_path, count_path)
+
+
 def count_existing_reported_games(report_path: str = FULL_REPORT_PATH) -> int:
     """
     Count how many games are already present in the full report markdown
     file, by counting headings of the form '## Game X'.
+
+    The count saved by the last append is used when the report has not
+    changed since; otherwise the headings are counted in one pass over
+    the raw bytes.
     """
     try:
-        with open(report_path, "r", encoding="utf-8") as f:
-            lines = f.readlines()
+        st = os.stat(report_path)
     except FileNotFoundError:
         return 0
 
-    count = 0
-    for line in lines:
-        if line.strip().startswith("## Game "):
-            count += 1
-    return count
+    try:
+        with open(_report_count_path(report_path), "r", encoding="utf-8") as f:
+            saved = json.load(f)
+        if saved["size"] == st.st_size and saved["mtime_ns"] == st.st_mtime_ns:
+            return int(saved["count"])
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    with open(report_path, "rb") as f:
+        data = f.read()
+    return data.count(b"\n## Game ") + (1 if data.startswith(b"## Game ") else 0)
 
 
-def build_summary_report(username: str, top_n_openings: int = 5) -> str:
+def build_summary_report(
+    username: str,
+    top_n_openings: int = 5,
+    games: Optional[List[Dict]] = None,
+) -> str:
     """
-    Build a markdown summary section with overall results, by color, and
-    by the most commonly played openings.
+    Build the markdown summary section as one string.
+
+    See iter_summary_report for the arguments.
     """
-    games = load_games_from_file(GAMES_JSON_PATH)
+    return "".join(iter_summary_report(username, top_n_openings=top_n_openings, games=games))
+
+
+def _load_summary_state(path: str, username_lower: str) -> Optional[Dict]:
+    """
+    Load the summary counters saved for username_lower, or None if there
+    are none (or they are unreadable), which forces a full rescan.
+    """
+    try:
+        with open(path, "rb") as f:
+            state = _json_loads(f.read())
+        if state["username"] != username_lower or not state["cursor"]:
+            return None
+        # Saved as a JSON [end_time, uuid] list; see _summary_key.
+        end_time, uuid = state["cursor"]
+        state["cursor"] = (int(end_time), str(uuid))
+        # JSON has no tuple keys; see _save_summary_state.
+        state["opening_color"] = {
+            tuple(key.rsplit("|", 1)): slot for key, slot in state["opening_color"].items()
+        }
+        return state
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        return None
+
+
+def _save_summary_state(path: str, state: Dict) -> None:
+    """Write the summary counters atomically."""
+    data = {
+        **state,
+        "opening_color": {
+            f"{opening}|{color}": slot
+            for (opening, color), slot in state["opening_color"].items()
+        },
+    }
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_json_dumps(data))
+    os.replace(tmp_path, path)
+
+
+def _summary_key(game: Dict) -> Tuple[int, str]:
+    """
+    Order games by (end_time, uuid) for the summary cursor, so games that
+    end in the same second are told apart. A missing or malformed
+    end_time counts as 0.
+    """
+    try:
+        end_time = int(game.get("end_time") or 0)
+    except (TypeError, ValueError):
+        end_time = 0
+    return end_time, str(game.get("uuid") or "")
+
+
+def iter_summary_report(
+    username: str,
+    top_n_openings: int = 5,
+    games: Optional[List[Dict]] = None,
+    state_path: Optional[str] = None,
+) -> Iterator[str]:
+    """
+    Yield a markdown summary section with overall results, by color, and
+    by the most commonly played openings, one line at a time.
+
+    Pass `games` to reuse an already loaded list; otherwise it is read
+    from games.json.
+
+    Pass `state_path` to keep the counters in that file between runs:
+    only games after the last counted one by (end_time, uuid) are then
+    added, instead of rescanning every game. The games must be the store's
+    chronologically ordered list.
+    """
+    if games is None:
+        games = load_games_from_file(GAMES_JSON_PATH)
     if not games:
-        return ""
+        return
 
     username_lower = username.lower()
 
-    total_counts: Counter = Counter()
-    color_counts: Dict[str, Counter] = {
-        "white": Counter(),
-        "black": Counter(),
-    }
-    opening_game_counts: Counter = Counter()
-    # opening -> color -> Counter(results)
-    opening_color_counts: Dict[str, Dict[str, Counter]] = defaultdict(
-        lambda: {"white": Counter(), "black": Counter()}
-    )
+    state = _load_summary_state(state_path, username_lower) if state_path else None
+    if state is None:
+        # Results are counted in [wins, draws, losses] lists indexed by
+        # _RESULT_ID, so each count is a list store rather than a hash lookup.
+        state = {
+            "username": username_lower,
+            # (end_time, uuid) of the last counted game
+            "cursor": None,
+            "total": [0, 0, 0],
+            "color": {"white": [0, 0, 0], "black": [0, 0, 0]},
+            "openings": {},
+            # (opening, color) -> [wins, draws, losses]
+            "opening_color": {},
+        }
+    cursor = state["cursor"]
+    total_counts: List[int] = state["total"]
+    color_counts: Dict[str, List[int]] = state["color"]
+    opening_game_counts: Dict[str, int] = state["openings"]
+    opening_color_counts: Dict[Tuple[str, str], List[int]] = state["opening_color"]
 
     for game in games:
-        white = game.get("white", {}) or {}
-        black = game.get("black", {}) or {}
-
-        white_name = str(white.get("username", "")).lower()
-        black_name = str(black.get("username", "")).lower()
-
-        if white_name == username_lower:
-            color = "white"
-            raw_result = str(white.get("result", ""))
-        elif black_name == username_lower:
-            color = "black"
-            raw_result = str(black.get("result", ""))
-        else:
+        game_key = _summary_key(game)
+        if cursor is not None and game_key <= cursor:
             continue
+        if state["cursor"] is None or game_key > state["cursor"]:
+            state["cursor"] = game_key
 
-        result = normalize_result(raw_result)
-        if result not in {"win", "draw", "loss"}:
+        identified = _identify_player(game, username_lower)
+        if identified is None:
+            continue
+        player, _, color = identified
+
+        rid = _RESULT_ID.get(normalize_result(str(player.get("result", ""))))
+        if rid is None:
             continue
 
         opening = get_opening_name(game)
 
-        total_counts[result] += 1
-        color_counts[color][result] += 1
-        opening_game_counts[opening] += 1
-        opening_color_counts[opening][color][result] += 1
+        total_counts[rid] += 1
+        color_counts[color][rid] += 1
+        opening_game_counts[opening] = opening_game_counts.get(opening, 0) + 1
+        key = (opening, color)
+        slot = opening_color_counts.get(key)
+        if slot is None:
+            slot = opening_color_counts[key] = [0, 0, 0]
+        slot[rid] += 1
+
+    if state_path and state["cursor"] != cursor:
+        _save_summary_state(state_path, state)
 
-    total_games = sum(total_counts.values())
+    total_games = sum(total_counts)
     if total_games == 0:
-        return ""
+        return
 
     def pct(count: int, total: int) -> float:
         return (count / total * 100.0) if total > 0 else 0.0
 
-    lines: List[str] = []
-    lines.append("## Summary and statistics")
-    lines.append("")
+    yield "## Summary and statistics\n"
+    yield "\n"
 
     # Overall results
-    wins = total_counts["win"]
-    draws = total_counts["draw"]
-    losses = total_counts["loss"]
+    wins, draws, losses = total_counts
 
-    lines.append("### Overall results")
-    lines.append(f"- **Games**: {total_games}")
-    lines.append(
+    yield "### Overall results\n"
+    yield f"- **Games**: {total_games}\n"
+    yield (
         f"- **Wins**: {wins} ({pct(wins, total_games):.1f}%), "
         f"**Draws**: {draws} ({pct(draws, total_games):.1f}%), "
-        f"**Losses**: {losses} ({pct(losses, total_games):.1f}%)"
+        f"**Losses**: {losses} ({pct(losses, total_games):.1f}%)\n"
     )
-    lines.append("")
+    yield "\n"
 
     # By color
-    lines.append("### Results by color")
+    yield "### Results by color\n"
     for color in ["white", "black"]:
-        c_counts = color_counts[color]
-        c_total = sum(c_counts.values())
+        cw, cd, cl = color_counts[color]
+        c_total = cw + cd + cl
         if c_total == 0:
             continue
-        cw = c_counts["win"]
-        cd = c_counts["draw"]
-        cl = c_counts["loss"]
         color_title = color.capitalize()
-        lines.append(f"- **{color_title}**: {c_total} games — "
-                     f"{cw} wins ({pct(cw, c_total):.1f}%), "
-                     f"{cd} draws ({pct(cd, c_total):.1f}%), "
-                     f"{cl} losses ({pct(cl, c_total):.1f}%)")
-    lines.append("")
+        yield (
+            f"- **{color_title}**: {c_total} games — "
+            f"{cw} wins ({pct(cw, c_total):.1f}%), "
+            f"{cd} draws ({pct(cd, c_total):.1f}%), "
+            f"{cl} losses ({pct(cl, c_total):.1f}%)\n"
+        )
+    yield "\n"
 
     # By opening (top N)
-    lines.append(f"### Results by opening (top {top_n_openings} by games played)")
+    yield f"### Results by opening (top {top_n_openings} by games played)\n"
     if not opening_game_counts:
-        lines.append("- **No openings to report yet.**")
+        yield "- **No openings to report yet.**\n"
     else:
-        for opening, games_for_opening in opening_game_counts.most_common(top_n_openings):
-            lines.append(f"- **{opening}** ({games_for_opening} games)")
-            oc_white = opening_color_counts[opening]["white"]
-            oc_black = opening_color_counts[opening]["black"]
+        # nlargest only keeps top_n_openings entries on its heap, and like
+        # most_common it breaks ties by first-seen order
+        top_openings = nlargest(
+            top_n_openings, opening_game_counts.items(), key=itemgetter(1)
+        )
+        for opening, games_for_opening in top_openings:
+            yield f"- **{opening}** ({games_for_opening} games)\n"
+            w_wins, w_draws, w_losses = opening_color_counts.get((opening, "white"), _NO_RESULTS)
+            b_wins, b_draws, b_losses = opening_color_counts.get((opening, "black"), _NO_RESULTS)
 
-            w_total = sum(oc_white.values())
-            b_total = sum(oc_black.values())
+            w_total = w_wins + w_draws + w_losses
+            b_total = b_wins + b_draws + b_losses
 
             if w_total > 0:
-                w_wins = oc_white["win"]
-                w_draws = oc_white["draw"]
-                w_losses = oc_white["loss"]
-                lines.append(
+                yield (
                     f"  - as White: {w_total} games — "
                     f"{w_wins} wins ({pct(w_wins, w_total):.1f}%), "
                     f"{w_draws} draws ({pct(w_draws, w_total):.1f}%), "
-                    f"{w_losses} losses ({pct(w_losses, w_total):.1f}%)"
+                    f"{w_losses} losses ({pct(w_losses, w_total):.1f}%)\n"
                 )
             if b_total > 0:
-                b_wins = oc_black["win"]
-                b_draws = oc_black["draw"]
-                b_losses = oc_black["loss"]
-                lines.append(
+                yield (
                     f"  - as Black: {b_total} games — "
                     f"{b_wins} wins ({pct(b_wins, b_total):.1f}%), "
                     f"{b_draws} draws ({pct(b_draws, b_total):.1f}%), "
-                    f"{b_losses} losses ({pct(b_losses, b_total):.1f}%)"
+                    f"{b_losses} losses ({pct(b_losses, b_total):.1f}%)\n"
                 )
-    lines.append("")
-
-    return "\n".join(lines)
 
 
 def append_new_games_to_full_report(username: str) -> None:
@@ -536,34 +1077,30 @@ def append_new_games_to_full_report(username: str) -> None:
         print("Full_report.md is already up to date with all games.")
         return
 
-    # Decide whether we need to include the header in the new chunk.
-    file_exists = os.path.exists(FULL_REPORT_PATH)
-    file_is_empty = False
-    if file_exists:
-        file_is_empty = os.path.getsize(FULL_REPORT_PATH) == 0
-
-    include_header = not file_exists or file_is_empty
-
-    report_chunk = build_markdown_report(
-        username,
-        start_at_game_index=already_reported,
-        include_header=include_header,
-    )
-
     # Build a fresh summary for all games so the last section of the
     # report always reflects current statistics.
-    summary_chunk = build_summary_report(username)
+    summary_lines = list(iter_summary_report(username, games=games, state_path=SUMMARY_STATE_PATH))
+
+    # One open call creates the report if needed and positions every
+    # write at its end; the header is only needed for an empty file.
+    fd = os.open(FULL_REPORT_PATH, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+    include_header = os.fstat(fd).st_size == 0
 
-    # Append or create the report file as appropriate.
-    mode = "a" if file_exists and not file_is_empty else "w"
-    with open(FULL_REPORT_PATH, mode, encoding="utf-8") as f:
-        if mode == "a":
+    # Stream the game sections straight into the file.
+    with os.fdopen(fd, "a", encoding="utf-8", buffering=1 << 20) as f:
+        if not include_header:
             # Ensure there's at least one blank line before new content.
             f.write("\n")
-        f.write(report_chunk)
-        if summary_chunk:
+        f.writelines(iter_markdown_report(
+            username,
+            start_at_game_index=already_reported,
+            include_header=include_header,
+            games=games,
+        ))
+        if summary_lines:
             f.write("\n")
-            f.write(summary_chunk)
+            f.writelines(summary_lines)
+    _save_report_count(FULL_REPORT_PATH, len(games))
 
     newly_added = len(games) - already_reported
     print(
@@ -580,14 +1117,28 @@ def copy_and_push_full_report() -> None:
     repo_dir = os.path.dirname(__file__)
     local_copy_path = os.path.join(repo_dir, "Full_report.md")
 
-    # Copy the report into the current folder
-    try:
-        shutil.copyfile(FULL_REPORT_PATH, local_copy_path)
-    except FileNotFoundError:
+    if not os.path.isfile(FULL_REPORT_PATH):
         print(f"Full report not found at {FULL_REPORT_PATH}; skipping copy and push.")
         return
 
-    print(f"Copied full report to local repo path: {local_copy_path}")
+    if os.path.exists(local_copy_path) and os.path.samefile(FULL_REPORT_PATH, local_copy_path):
+        # The report is already written in the repo (or hardlinked there).
+        print(f"Full report already at local repo path: {local_copy_path}")
+    else:
+        # Hardlink the report into the current folder so no bytes are
+        # copied, swapping it in atomically. Fall back to a real copy
+        # across filesystems (e.g. a vault on another volume).
+        tmp_path = local_copy_path + ".tmp"
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        try:
+            os.link(FULL_REPORT_PATH, tmp_path)
+        except OSError:
+            shutil.copyfile(FULL_REPORT_PATH, tmp_path)
+        os.replace(tmp_path, local_copy_path)
+        print(f"Copied full report to local repo path: {local_copy_path}")
 
     token = os.environ.get("GITHUB_PASSWORD")
     if not token:
@@ -600,33 +1151,33 @@ def copy_and_push_full_report() -> None:
         f"{github_username}/chess_reporting.git"
     )
 
-    def run_git(*args: str) -> subprocess.CompletedProcess:
-        return subprocess.run(
-            ["git", "-C", repo_dir, *args],
-            capture_output=True,
-            text=True,
-        )
-
-    # Stage the local copy
-    add_result = run_git("add", "Full_report.md")
-    if add_result.returncode != 0:
-        print(f"git add failed: {add_result.stderr.strip()}")
-        return
-
-    # Commit changes (if any)
-    commit_result = run_git("commit", "-m", "Update Full_report.md")
-    if commit_result.returncode != 0:
-        stderr = commit_result.stderr.lower()
-        if "nothing to commit" in stderr:
-            print("No changes to commit for Full_report.md; skipping push.")
-            return
-        print(f"git commit failed: {commit_result.stderr.strip()}")
+    # Stage, commit and push from one shell instead of spawning a process
+    # per git command. Each step exits with its own status so failures can
+    # still be reported individually; the remote URL is passed as an
+    # argument rather than spliced into the script.
+    script = (
+        'git add Full_report.md || exit 10\n'
+        'git diff --cached --quiet && exit 20\n'
+        'git commit -q -m "Update Full_report.md" || exit 11\n'
+        'git push --no-verify "$1" HEAD:main || exit 12\n'
+    )
+    # Only stderr is looked at (on failure), so stdout is discarded. Never
+    # prompt for credentials, and skip optional index locks so a stale
+    # background git process cannot stall the push.
+    result = subprocess.run(
+        ["/bin/sh", "-c", script, "sh", remote_url],
+        cwd=repo_dir,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        env={**os.environ, "GIT_TERMINAL_PROMPT": "0", "GIT_OPTIONAL_LOCKS": "0"},
+    )
+    if result.returncode == 20:
+        print("No changes to commit for Full_report.md; skipping push.")
         return
-
-    # Push to GitHub
-    push_result = run_git("push", remote_url, "HEAD:main")
-    if push_result.returncode != 0:
-        print(f"git push failed: {push_result.stderr.strip()}")
+    if result.returncode != 0:
+        step = {10: "add", 11: "commit", 12: "push"}.get(result.returncode, "command")
+        print(f"git {step} failed: {result.stderr.strip()}")
         return
 
     print("Successfully pushed Full_report.md to GitHub.")
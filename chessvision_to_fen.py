@@ -10,6 +10,8 @@ Usage:
 
 from __future__ import annotations
 
+import functools
+import itertools
 import sys
 from pathlib import Path
 
@@ -22,12 +24,24 @@ CHESSVISION_DIR = Path(__file__).parent / "ChessVisionAI"
 sys.path.insert(0, str(CHESSVISION_DIR))
 
 from config import class_labels, class_to_fen, img_width, img_height
+from tflite_model import TFLiteClassifier
 
+import chess_model_server
 
-def load_model(model_path: Path | None = None) -> tf.keras.Model:
-    """Load the trained ChessVisionAI model."""
+
+@functools.lru_cache(maxsize=1)
+def load_model(model_path: Path | None = None) -> tf.keras.Model | TFLiteClassifier:
+    """
+    Load the trained ChessVisionAI model (once per process).
+
+    The int8 TFLite model written by litify.py is preferred when it
+    exists, as it runs several times faster on CPU; otherwise the Keras
+    model is used. A .tflite model_path is loaded with TFLite too.
+    """
     if model_path is None:
-        model_path = CHESSVISION_DIR / "models" / "chess_classifier_10k.keras"
+        model_path = CHESSVISION_DIR / "models" / "chess_classifier_10k_int8.tflite"
+        if not model_path.exists():
+            model_path = CHESSVISION_DIR / "models" / "chess_classifier_10k.keras"
     
     if not model_path.exists():
         raise FileNotFoundError(
@@ -35,9 +49,107 @@ def load_model(model_path: Path | None = None) -> tf.keras.Model:
             "Please run datagen.ipynb and train.ipynb first."
         )
     
+    if model_path.suffix == ".tflite":
+        return TFLiteClassifier(model_path)
     return tf.keras.models.load_model(str(model_path))
 
 
+@functools.lru_cache(maxsize=None)
+def compiled_inference(model: tf.keras.Model) -> tf.types.experimental.GenericFunction:
+    """
+    Wrap a model's forward pass in a tf.function with a fixed input
+    signature, so it is traced once and reused for every board instead
+    of going through Model.predict on each call.
+
+    It takes uint8 pixels and normalizes them as its first op, so
+    batches stay a quarter of the float32 size until they reach the
+    model.
+    """
+    return tf.function(
+        lambda batch: model(tf.cast(batch, tf.float32) / 255.0, training=False),
+        input_signature=[tf.TensorSpec([None, img_height, img_width, 3], tf.uint8)],
+    )
+
+
+def board_to_batch(board: np.ndarray) -> tf.Tensor:
+    """
+    Split an (H, W, 3) uint8 board into its 64 squares and resize them
+    to the model input, as one (64, img_height, img_width, 3) uint8
+    batch (see compiled_inference for the normalization).
+
+    The squares are cut out with a single reshape/transpose (row-major,
+    a8 first) and resized together, instead of one PIL crop and resize
+    per square.
+    """
+    square_h = board.shape[0] // 8
+    square_w = board.shape[1] // 8
+    tiles = (
+        board[:8 * square_h, :8 * square_w]
+        .reshape(8, square_h, 8, square_w, 3)
+        .transpose(0, 2, 1, 3, 4)
+        .reshape(64, square_h, square_w, 3)
+    )
+    # Bicubic with antialiasing to match PIL's default resize, rounded
+    # back to uint8 pixels as PIL would
+    batch = tf.image.resize(tiles, (img_height, img_width), method="bicubic", antialias=True)
+    return tf.cast(tf.round(tf.clip_by_value(batch, 0.0, 255.0)), tf.uint8)
+
+
+# Label lookups for the vectorized thresholding in threshold_labels
+CLASS_LABELS = np.array(class_labels)
+EMPTY_IDX = class_labels.index("empty")
+PAWN_MASK = np.array([label in ("w_pawn", "b_pawn") for label in class_labels])
+
+
+def threshold_labels(predictions: np.ndarray) -> np.ndarray:
+    """
+    Turn (N, num_classes) predictions into N labels, with confidence
+    thresholding applied to all squares at once.
+
+    Pawns are often confused with empty squares, so they need 95%+
+    confidence and almost no "empty" probability; other low-confidence
+    pieces fall back to empty if "empty" is plausible.
+    """
+    idx = predictions.argmax(axis=1)
+    confidence = predictions[np.arange(len(predictions)), idx]
+    empty_conf = predictions[:, EMPTY_IDX]
+    is_pawn = PAWN_MASK[idx]
+    reject = np.where(
+        is_pawn,
+        (confidence < 0.95) | (empty_conf > 0.02),
+        (idx != EMPTY_IDX) & (confidence < 0.50) & (empty_conf > 0.15),
+    )
+    idx[reject] = EMPTY_IDX
+    return CLASS_LABELS[idx]
+
+
+# Squares whose pixel standard deviation is at most this in every colour
+# channel are blank and are labelled empty without running the model.
+# Per channel, as the std pooled over R, G and B is large for any
+# flat square that isn't gray.
+EMPTY_STD_THRESHOLD = 8.0
+
+
+def classify_squares(
+    batch: np.ndarray, model: tf.keras.Model | TFLiteClassifier
+) -> np.ndarray:
+    """
+    Predict class probabilities for an (N, H, W, 3) uint8 batch of
+    squares. Near-uniform squares skip the model and get probability 1
+    for "empty", so only squares with something on them are classified.
+    """
+    stds = batch.std(axis=(1, 2)).max(axis=-1)
+    busy = stds > EMPTY_STD_THRESHOLD
+    predictions = np.zeros((len(batch), len(class_labels)), dtype=np.float32)
+    predictions[~busy, EMPTY_IDX] = 1.0
+    if busy.any():
+        if isinstance(model, TFLiteClassifier):
+            predictions[busy] = model(batch[busy])
+        else:
+            predictions[busy] = compiled_inference(model)(tf.convert_to_tensor(batch[busy])).numpy()
+    return predictions
+
+
 def classify_chessboard(
     image_path: str | Path,
     model: tf.keras.Model,
@@ -52,59 +164,14 @@ def classify_chessboard(
     Returns:
         8x8 list of piece labels (e.g., 'w_pawn', 'b_rook', 'empty')
     """
-    chessboard = Image.open(image_path).convert("RGB")
-    
-    # Assume square board
-    board_width, board_height = chessboard.size
-    square_w = board_width // 8
-    square_h = board_height // 8
-    
-    squares = []
-    for row in range(8):
-        for col in range(8):
-            left = col * square_w
-            upper = row * square_h
-            right = left + square_w
-            lower = upper + square_h
-            square = chessboard.crop((left, upper, right, lower))
-            squares.append(square)
+    chessboard = np.asarray(Image.open(image_path).convert("RGB"))
     
     # Preprocess and batch classify
-    batch = np.array([
-        np.array(sq.resize((img_width, img_height))) / 255.0
-        for sq in squares
-    ], dtype=np.float32)
+    batch = board_to_batch(chessboard).numpy()
+    predictions = classify_squares(batch, model)
     
-    predictions = model.predict(batch, verbose=0)
-    
-    # Classify with confidence thresholding
-    # Pawns are often confused with empty squares, so require very high confidence
-    empty_idx = class_labels.index("empty")
-    
-    classifications = []
-    for p in predictions:
-        idx = np.argmax(p)
-        confidence = p[idx]
-        label = class_labels[idx]
-        empty_conf = p[empty_idx]
-        
-        # For pawns: require 95%+ confidence, OR if empty has ANY probability, reject
-        if label in ("w_pawn", "b_pawn"):
-            if confidence < 0.95 or empty_conf > 0.02:
-                label = "empty"
-        # For other pieces with low confidence, check empty
-        elif label != "empty" and confidence < 0.50:
-            if empty_conf > 0.15:
-                label = "empty"
-        
-        classifications.append(label)
-    
-    # Reshape into 8x8 board
-    board = [
-        [classifications[row * 8 + col] for col in range(8)]
-        for row in range(8)
-    ]
-    return board
+    # Classify with confidence thresholding, then reshape into 8x8 board
+    return threshold_labels(predictions).reshape(8, 8).tolist()
 
 
 def board_to_fen(board: list[list[str]]) -> str:
@@ -119,20 +186,14 @@ def board_to_fen(board: list[list[str]]) -> str:
     """
     fen_rows = []
     for row in board:
-        fen_row = ""
-        empty_count = 0
-        for square in row:
-            fen_piece = class_to_fen[square]
-            if fen_piece == "1":
-                empty_count += 1
-            else:
-                if empty_count > 0:
-                    fen_row += str(empty_count)
-                    empty_count = 0
-                fen_row += fen_piece
-        if empty_count > 0:
-            fen_row += str(empty_count)
-        fen_rows.append(fen_row)
+        # Runs of empty squares become their length, runs of pieces
+        # their letters
+        codes = [class_to_fen[square] for square in row]
+        parts = [
+            str(sum(1 for _ in run)) if is_empty else "".join(run)
+            for is_empty, run in itertools.groupby(codes, key=lambda c: c == "1")
+        ]
+        fen_rows.append("".join(parts))
     return "/".join(fen_rows)
 
 
@@ -161,11 +222,14 @@ def main() -> None:
         print(f"Error: Image not found: {image_path}")
         sys.exit(1)
     
-    print("Loading model...")
-    model = load_model()
-    
     print(f"Processing: {image_path}")
-    fen = image_to_fen(image_path, model)
+    try:
+        # Use the warm model of a running chess_model_server.py if there is one
+        fen = chess_model_server.request("fen", image_path)
+    except OSError:
+        print("Loading model...")
+        model = load_model()
+        fen = image_to_fen(image_path, model)
     print(f"FEN: {fen}")
 
 
@@ -1,12 +1,48 @@
+import atexit
 import io
 import os
-from typing import Dict, Optional, List, Tuple
+import shelve
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, List, Tuple, Union
 
 import chess
 import chess.pgn
 import chess.engine
 
 
+# Evaluations persisted across runs, keyed by position and depth.
+POSITION_CACHE_PATH = os.environ.get(
+    "CHESS_ENGINE_CACHE", os.path.join(os.path.expanduser("~"), ".chess_engine_cache")
+)
+
+
+# Engine processes analysing a game's positions in parallel.
+ENGINE_WORKERS = min(os.cpu_count() or 1, 4)
+
+
+# Plies analysed per evaluate_many call. For wins and losses the analysis
+# stops early once a swing of EARLY_STOP_SWING centipawns has been found
+# after EARLY_STOP_PLY plies: the game is decided and the rest can't
+# matter. Draws are always analysed to the end, as a big swing there is
+# often reversed later.
+EVAL_CHUNK_PLIES = 4 * ENGINE_WORKERS
+EARLY_STOP_PLY = 20
+EARLY_STOP_SWING = 500
+
+
+# Version of the commentary text and the analysis behind it. Caches of
+# finished commentaries include it in their keys; bump it whenever a
+# change would alter the commentary generated for the same game.
+COMMENTARY_VERSION = 1
+
+
+# Opening plies that are not analysed; no decisive swing happens this
+# early in practice. The first analysed position is the baseline that
+# later swings are measured from.
+OPENING_SKIP_PLIES = 6
+
+
 def _find_engine_path(explicit_path: Optional[str] = None) -> Optional[str]:
     """
     Try to find a usable Stockfish (or compatible UCI) engine binary.
@@ -47,16 +83,260 @@ def _score_to_cp(score: chess.engine.PovScore) -> int:
         mate_in = score.mate()
         if mate_in is None:
             return 0
+        if mate_in == 0:
+            # Mate already on the board: mate() is 0 both for the side
+            # that delivered it (MateGiven) and the side that is mated.
+            return 800 if score == chess.engine.MateGiven else -800
         return 800 if mate_in > 0 else -800
     cp = score.score()
     return cp if cp is not None else 0
 
 
+class CommentaryEngine:
+    """
+    Keep a small pool of UCI engine processes open across several games.
+
+    Evaluations are looked up in an on-disk position cache first (see
+    evaluate_many), so the engines are only started when the first
+    uncached position needs analysing, and are shut down when the `with`
+    block exits:
+
+        with CommentaryEngine() as engine:
+            for game in games:
+                generate_engine_commentary_for_game(game, username, engine=engine)
+    """
+
+    def __init__(
+        self,
+        engine_path: Optional[str] = None,
+        cache_path: Optional[str] = POSITION_CACHE_PATH,
+        workers: int = ENGINE_WORKERS,
+    ):
+        self.engine_path = engine_path
+        self.cache_path = cache_path
+        self.workers = max(1, workers)
+        self._engines: List[chess.engine.SimpleEngine] = []
+        self._failed = False
+        self._cache: Optional[shelve.Shelf] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Serializes engine start-up and cache access between threads.
+        self._lock = threading.RLock()
+
+    def _start(self) -> List[chess.engine.SimpleEngine]:
+        """Start the engine pool if needed; empty if no engine is available."""
+        with self._lock:
+            if not self._engines and not self._failed:
+                engine_exec = _find_engine_path(self.engine_path)
+                # Split the cores and hash between the engines.
+                options = {
+                    "Threads": max(1, (os.cpu_count() or 1) // self.workers),
+                    "Hash": max(16, 512 // self.workers),
+                }
+                for _ in range(self.workers if engine_exec else 0):
+                    try:
+                        uci_engine = chess.engine.SimpleEngine.popen_uci(engine_exec)
+                    except Exception:
+                        break
+                    try:
+                        uci_engine.configure(options)
+                    except Exception:
+                        # Not every UCI engine has these options.
+                        pass
+                    self._engines.append(uci_engine)
+                # Don't retry a missing or broken engine for every game.
+                self._failed = not self._engines
+            return self._engines
+
+    def open(self) -> Optional[chess.engine.SimpleEngine]:
+        """Return a running engine, starting the pool if needed, or None if unavailable."""
+        engines = self._start()
+        return engines[0] if engines else None
+
+    def _position_cache(self) -> Optional[shelve.Shelf]:
+        if self._cache is None and self.cache_path:
+            try:
+                self._cache = shelve.open(self.cache_path)
+            except Exception:
+                # Run uncached rather than fail on a broken cache file.
+                self.cache_path = None
+        return self._cache
+
+    def _analyse(
+        self,
+        uci_engine: chess.engine.SimpleEngine,
+        board: chess.Board,
+        key: str,
+        depth: int,
+        game: object,
+    ) -> Optional[int]:
+        info = uci_engine.analyse(board, chess.engine.Limit(depth=depth), game=game)
+        score = info.get("score")
+        if score is None:
+            return None
+        cp_white = _score_to_cp(score.pov(chess.WHITE))
+        with self._lock:
+            if self._cache is not None:
+                self._cache[key] = cp_white
+        return cp_white
+
+    def evaluate_many(
+        self, boards: List[chess.Board], depth: int, game: object = None
+    ) -> List[Union[int, None, Exception]]:
+        """
+        Evaluate several positions, in centipawns from White's point of
+        view (see _score_to_cp). Each result is None if the engine gave
+        no score, or the exception raised for that position (including
+        no engine being available).
+
+        Results are cached per position (EPD, so transpositions share an
+        entry) and depth. Uncached positions are analysed in parallel by
+        the engine pool, each engine taking the next one as soon as it is
+        free.
+
+        Pass the same `game` key for every position of one game; the
+        engines get a ucinewgame whenever it changes, instead of being
+        restarted.
+        """
+        results: List[Union[int, None, Exception]] = [None] * len(boards)
+        # v2: entries from before delivered mates were scored correctly
+        # (see _score_to_cp) are not reused.
+        keys = [f"{board.epd()}@d{depth}v2" for board in boards]
+        misses = []
+        with self._lock:
+            cache = self._position_cache()
+            for i, key in enumerate(keys):
+                if cache is not None and key in cache:
+                    results[i] = cache[key]
+                else:
+                    misses.append(i)
+        if not misses:
+            return results
+
+        engines = self._start()
+        if not engines:
+            error = RuntimeError("No chess engine available")
+            for i in misses:
+                results[i] = error
+            return results
+
+        # Analysis time varies a lot between positions at a fixed depth, so
+        # positions are handed out one at a time rather than split up
+        # front; an engine never sits idle while another has a backlog.
+        pending = iter(misses)
+        pending_lock = threading.Lock()
+
+        def run(worker: int) -> None:
+            while True:
+                with pending_lock:
+                    i = next(pending, None)
+                if i is None:
+                    return
+                try:
+                    results[i] = self._analyse(engines[worker], boards[i], keys[i], depth, game)
+                except Exception as e:
+                    results[i] = e
+
+        if len(engines) == 1:
+            run(0)
+        else:
+            with self._lock:
+                if self._executor is None:
+                    # Kept for the engines' lifetime instead of starting
+                    # new threads for every game.
+                    self._executor = ThreadPoolExecutor(max_workers=len(engines))
+                executor = self._executor
+            list(executor.map(run, range(len(engines))))
+        return results
+
+    def evaluate(self, board: chess.Board, depth: int, game: object = None) -> Optional[int]:
+        """
+        Evaluate one position (see evaluate_many). Raises if it is not
+        cached and the engine is unavailable or fails.
+        """
+        result = self.evaluate_many([board], depth, game=game)[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def close(self) -> None:
+        with self._lock:
+            if self._cache is not None:
+                self._cache.close()
+                self._cache = None
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+            for uci_engine in self._engines:
+                try:
+                    uci_engine.quit()
+                except Exception:
+                    pass
+            self._engines = []
+
+    def __enter__(self) -> "CommentaryEngine":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+# Engines shared by calls that don't pass their own, keyed by engine_path.
+_shared_engines: Dict[Optional[str], CommentaryEngine] = {}
+_shared_engines_lock = threading.Lock()
+
+
+def get_shared_engine(engine_path: Optional[str] = None) -> CommentaryEngine:
+    """
+    Return a process-wide CommentaryEngine, so its engine process is
+    started once and reused by every later call. It is closed at exit.
+    """
+    with _shared_engines_lock:
+        engine = _shared_engines.get(engine_path)
+        if engine is None:
+            engine = _shared_engines[engine_path] = CommentaryEngine(engine_path)
+            atexit.register(engine.close)
+        return engine
+
+
+def engine_name(engine_path: Optional[str] = None) -> Optional[str]:
+    """Return the shared engine's UCI name (e.g. "Stockfish 16"), or None if unavailable."""
+    uci_engine = get_shared_engine(engine_path).open()
+    return uci_engine.id.get("name") if uci_engine else None
+
+
+def generate_engine_commentary_for_games(
+    games: List[Dict],
+    username: str,
+    engine_path: Optional[str] = None,
+    depth: int = 12,
+) -> Dict[str, str]:
+    """
+    Generate commentary for several games with the shared engine process
+    (see get_shared_engine).
+
+    Returns {uuid: commentary} for the games that got any; games without
+    a uuid are skipped.
+    """
+    commentaries: Dict[str, str] = {}
+    engine = get_shared_engine(engine_path)
+    for game_data in games:
+        uuid = game_data.get("uuid")
+        if not uuid:
+            continue
+        commentary = generate_engine_commentary_for_game(
+            game_data, username, depth=depth, engine=engine
+        )
+        if commentary:
+            commentaries[uuid] = commentary
+    return commentaries
+
+
 def generate_engine_commentary_for_game(
     game_data: Dict,
     username: str,
     engine_path: Optional[str] = None,
     depth: int = 12,
+    engine: Optional[CommentaryEngine] = None,
 ) -> str:
     """
     Use a chess engine to analyze a single game and return a short
@@ -65,7 +345,13 @@ def generate_engine_commentary_for_game(
     The analysis is done from the perspective of `username`. We look for
     the largest evaluation swing in that player's favor (for wins) or
     against them (for losses) and describe that move.
+
+    Pass an open CommentaryEngine to use its engine process; otherwise
+    the shared one for engine_path is used (see get_shared_engine).
     """
+    if engine is None:
+        engine = get_shared_engine(engine_path)
+
     pgn_text = game_data.get("pgn")
     if not pgn_text:
         return ""
@@ -105,11 +391,6 @@ def generate_engine_commentary_for_game(
     else:
         player_result = "other"
 
-    engine_exec = _find_engine_path(engine_path)
-    if not engine_exec:
-        # If no engine is available, don't fail the whole report.
-        return ""
-
     try:
         game = chess.pgn.read_game(io.StringIO(pgn_text))
     except Exception:
@@ -120,70 +401,81 @@ def generate_engine_commentary_for_game(
 
     board = game.board()
 
-    try:
-        engine = chess.engine.SimpleEngine.popen_uci(engine_exec)
-    except Exception:
-        return ""
-
     eval_history: List[Tuple[int, int, str, bool]] = []
     # (ply_index, eval_cp, san_move, mover_is_player)
 
-    try:
-        for ply_index, move in enumerate(game.mainline_moves(), start=1):
-            san = board.san(move)
-            board.push(move)
-            try:
-                info = engine.analyse(board, chess.engine.Limit(depth=depth))
-            except Exception:
+    # Play the game out first: the positions are independent, so they
+    # can then be analysed in parallel.
+    positions: List[Tuple[int, str, chess.Board]] = []
+    for ply_index, move in enumerate(game.mainline_moves(), start=1):
+        san = board.san(move)
+        board.push(move)
+        positions.append((ply_index, san, board.copy()))
+
+    # Scan for the most "decisive" swing as the evaluations come in, so
+    # the analysis can stop once it is clear (see EARLY_STOP_SWING).
+    best_index = None
+    best_magnitude = 0
+    decided = False
+
+    for start in range(OPENING_SKIP_PLIES, len(positions), EVAL_CHUNK_PLIES):
+        chunk = positions[start:start + EVAL_CHUNK_PLIES]
+        evals = engine.evaluate_many([pos for _, _, pos in chunk], depth, game=game)
+
+        for (ply_index, san, pos), cp_white in zip(chunk, evals):
+            if isinstance(cp_white, Exception):
+                # Includes no engine being available: don't fail the whole report.
+                decided = True
                 break
 
-            score = info.get("score")
-            if score is None:
+            if cp_white is None:
                 continue
 
-            pov_score = score.pov(player_color)
-            cp_value = _score_to_cp(pov_score)
-            mover_is_player = (board.turn != player_color)  # mover was the side that just played
+            # _score_to_cp maps every score, including mate-in-0 on either
+            # side, to +/- the same value, so flipping the sign gives
+            # Black's point of view.
+            cp_value = cp_white if player_color == chess.WHITE else -cp_white
+            mover_is_player = (pos.turn != player_color)  # mover was the side that just played
             eval_history.append((ply_index, cp_value, san, mover_is_player))
-    finally:
-        try:
-            engine.quit()
-        except Exception:
-            pass
+            if len(eval_history) < 2:
+                continue
 
-    if len(eval_history) < 2:
-        return ""
+            i = len(eval_history) - 1
+            delta = cp_value - eval_history[i - 1][1]
 
-    # Find the most "decisive" swing.
-    best_index = None
-    best_magnitude = 0
-    prev_cp = eval_history[0][1]
+            if player_result == "win":
+                # Look for big positive swings for the player.
+                benefit = delta
+                if benefit > 100 and benefit > best_magnitude:
+                    best_magnitude = benefit
+                    best_index = i
+            elif player_result == "loss":
+                # Look for big negative swings on moves played by the player.
+                if mover_is_player:
+                    drop = -delta  # how much worse it got
+                    if drop > 100 and drop > best_magnitude:
+                        best_magnitude = drop
+                        best_index = i
+            else:
+                # For draws/other, look for the biggest absolute swing either way.
+                swing = abs(delta)
+                if swing > 100 and swing > best_magnitude:
+                    best_magnitude = swing
+                    best_index = i
 
-    for i in range(1, len(eval_history)):
-        ply_index, curr_cp, san, mover_is_player = eval_history[i]
-        delta = curr_cp - prev_cp
+            if (
+                player_result in ("win", "loss")
+                and ply_index > EARLY_STOP_PLY
+                and best_magnitude > EARLY_STOP_SWING
+            ):
+                decided = True
+                break
 
-        if player_result == "win":
-            # Look for big positive swings for the player.
-            benefit = delta
-            if benefit > 100 and benefit > best_magnitude:
-                best_magnitude = benefit
-                best_index = i
-        elif player_result == "loss":
-            # Look for big negative swings on moves played by the player.
-            if mover_is_player:
-                drop = -delta  # how much worse it got
-                if drop > 100 and drop > best_magnitude:
-                    best_magnitude = drop
-                    best_index = i
-        else:
-            # For draws/other, look for the biggest absolute swing either way.
-            swing = abs(delta)
-            if swing > 100 and swing > best_magnitude:
-                best_magnitude = swing
-                best_index = i
+        if decided:
+            break
 
-        prev_cp = curr_cp
+    if len(eval_history) < 2:
+        return ""
 
     if best_index is None:
         # No single "decisive" blunder or winning shot detected.
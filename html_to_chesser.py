@@ -14,34 +14,45 @@ Output:
 
 from __future__ import annotations
 
+import itertools
 import sys
 import re
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from html.parser import HTMLParser
-from PIL import Image
+import cv2
 import numpy as np
 
 # Add ChessVisionAI to path for the model
 SCRIPT_DIR = Path(__file__).parent
 sys.path.insert(0, str(SCRIPT_DIR / "ChessVisionAI"))
 
-import tensorflow as tf
-from config import class_labels, class_to_fen, img_width, img_height
+from config import class_to_fen
 
+import chess_model_server
 
-def load_model():
-    """Load the trained ChessVisionAI model."""
-    model_path = SCRIPT_DIR / "ChessVisionAI" / "models" / "chess_classifier_10k.keras"
-    if not model_path.exists():
-        raise FileNotFoundError(f"Model not found: {model_path}")
-    return tf.keras.models.load_model(str(model_path))
+# The model and the square classification are shared with the single
+# board converter
+from chessvision_to_fen import board_to_batch, classify_squares, load_model, threshold_labels
 
 
-def image_to_fen(image_path: Path, model) -> str:
-    """Convert a chess diagram image to FEN notation."""
-    img = Image.open(image_path).convert("RGB")
-    w, h = img.size
+# Diagrams classified per model call. Each contributes 64 squares, so this
+# bounds the batch (and its memory) for chapters with many diagrams.
+DIAGRAM_BATCH = 16
+
+# Threads decoding and tiling diagrams while the model runs.
+PREPROCESS_WORKERS = min(os.cpu_count() or 1, DIAGRAM_BATCH)
+
+
+def diagram_squares(image_path: Path) -> np.ndarray:
+    """Crop a chess diagram into a (64, H, W, 3) uint8 batch of squares."""
+    # Decode once; every crop below is a slice (a view, not a copy)
+    img = cv2.imread(str(image_path), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError(f"Could not read image: {image_path}")
+    img = img[:, :, ::-1]  # BGR -> RGB
+    h, w = img.shape[:2]
     
     # Crop border if not square
     if abs(w - h) > 5:
@@ -49,82 +60,110 @@ def image_to_fen(image_path: Path, model) -> str:
         size = min(w, h)
         left = (w - size) // 2
         top = (h - size) // 2
-        img = img.crop((left, top, left + size, top + size))
+        img = img[top:top + size, left:left + size]
     
     # Also try cropping 2px border
-    w, h = img.size
+    h, w = img.shape[:2]
     if w > 20 and h > 20:
-        img_test = img.crop((2, 2, w-2, h-2))
+        img_test = img[2:h - 2, 2:w - 2]
         # Make square
-        w2, h2 = img_test.size
+        h2, w2 = img_test.shape[:2]
         size = min(w2, h2)
         left = (w2 - size) // 2
         top = (h2 - size) // 2
-        img = img_test.crop((left, top, left + size, top + size))
-    
-    w, h = img.size
-    sq_w = w // 8
-    sq_h = h // 8
-    
-    # Extract squares
-    squares = []
-    for row in range(8):
-        for col in range(8):
-            x0, x1 = col * sq_w, (col + 1) * sq_w
-            y0, y1 = row * sq_h, (row + 1) * sq_h
-            sq = img.crop((x0, y0, x1, y1))
-            squares.append(sq)
-    
-    # Batch classify
-    batch = np.array([
-        np.array(sq.resize((img_width, img_height))) / 255.0
-        for sq in squares
-    ], dtype=np.float32)
-    
-    predictions = model.predict(batch, verbose=0)
+        img = img_test[top:top + size, left:left + size]
     
+    # All 64 squares, cut and resized together (row-major, a8 first)
+    return board_to_batch(np.ascontiguousarray(img)).numpy()
+
+
+def predictions_to_fen(predictions: np.ndarray) -> str:
+    """Turn the 64 per-square predictions of one diagram into FEN."""
     # Classify with confidence thresholding
-    empty_idx = class_labels.index("empty")
-    classifications = []
-    
-    for p in predictions:
-        idx = np.argmax(p)
-        confidence = p[idx]
-        label = class_labels[idx]
-        empty_conf = p[empty_idx]
-        
-        # Pawn thresholding
-        if label in ("w_pawn", "b_pawn"):
-            if confidence < 0.95 or empty_conf > 0.02:
-                label = "empty"
-        elif label != "empty" and confidence < 0.50:
-            if empty_conf > 0.15:
-                label = "empty"
-        
-        classifications.append(label)
+    classifications = threshold_labels(predictions).tolist()
     
     # Build FEN
     fen_rows = []
     for row in range(8):
-        fen_row = ""
-        empty_count = 0
-        for col in range(8):
-            label = classifications[row * 8 + col]
-            fen_piece = class_to_fen[label]
-            if fen_piece == "1":
-                empty_count += 1
-            else:
-                if empty_count > 0:
-                    fen_row += str(empty_count)
-                    empty_count = 0
-                fen_row += fen_piece
-        if empty_count > 0:
-            fen_row += str(empty_count)
-        fen_rows.append(fen_row or "8")
+        # Runs of empty squares become their length, runs of pieces
+        # their letters
+        codes = [class_to_fen[label] for label in classifications[row * 8:row * 8 + 8]]
+        parts = [
+            str(sum(1 for _ in run)) if is_empty else "".join(run)
+            for is_empty, run in itertools.groupby(codes, key=lambda c: c == "1")
+        ]
+        fen_rows.append("".join(parts) or "8")
     
     return "/".join(fen_rows)
 
 
+def image_to_fen(image_path: Path, model) -> str:
+    """Convert a chess diagram image to FEN notation."""
+    batch = diagram_squares(image_path)
+    predictions = classify_squares(batch, model)
+    return predictions_to_fen(predictions)
+
+
+def images_to_fens(image_paths: list[Path], model) -> list[str | Exception]:
+    """
+    Convert several diagrams to FEN, classifying their squares together
+    in batches of DIAGRAM_BATCH diagrams instead of one model call each.
+    The next batch is decoded and tiled on worker threads while the
+    model classifies the current one.
+
+    Returns one FEN per path, or the exception raised for that diagram.
+    """
+    def load(image_path: Path) -> np.ndarray | Exception:
+        try:
+            return diagram_squares(image_path)
+        except Exception as e:
+            return e
+
+    batches = [
+        image_paths[start:start + DIAGRAM_BATCH]
+        for start in range(0, len(image_paths), DIAGRAM_BATCH)
+    ]
+    results: list[str | Exception] = []
+    with ThreadPoolExecutor(max_workers=PREPROCESS_WORKERS) as executor:
+        loading = [executor.submit(load, path) for path in batches[0]] if batches else []
+        for next_paths in batches[1:] + [[]]:
+            squares = [future.result() for future in loading]
+            loading = [executor.submit(load, path) for path in next_paths]
+            results.extend(_classify_diagrams(squares, model))
+    return results
+
+
+def _classify_diagrams(
+    squares: list[np.ndarray | Exception], model
+) -> list[str | Exception]:
+    """FENs for a batch of diagram squares (see images_to_fens)."""
+    results: list[str | Exception] = []
+    loaded = [sq for sq in squares if not isinstance(sq, Exception)]
+    try:
+        predictions = classify_squares(np.concatenate(loaded), model) if loaded else None
+    except Exception as e:
+        predictions = e
+
+    offset = 0
+    for sq in squares:
+        if isinstance(sq, Exception):
+            results.append(sq)
+        elif isinstance(predictions, Exception):
+            results.append(predictions)
+        else:
+            try:
+                results.append(predictions_to_fen(predictions[offset:offset + 64]))
+            except Exception as e:
+                results.append(e)
+            offset += 64
+    return results
+
+
+# Whitespace runs in text nodes, and runs of blank lines in the output
+_WS_RE = re.compile(r'\s+')
+_NL_RE = re.compile(r'\n{3,}')
+
+
 class ChessHTMLParser(HTMLParser):
     """Parse HTML and convert to markdown with Chesser diagrams."""
     
@@ -133,7 +172,12 @@ class ChessHTMLParser(HTMLParser):
         self.images_dir = images_dir
         self.model = model
         self.output = []
-        self.current_text = ""
+        # Text pieces of the current block, joined on flush
+        self.current_text: list[str] = []
+        # Text seen since the last tag. Input fed in chunks can split one
+        # text run over several handle_data calls; the run is only
+        # formatted once it is complete (see _end_data_run).
+        self._data_run: list[str] = []
         self.in_bold = False
         self.in_italic = False
         self.in_list = False
@@ -141,8 +185,11 @@ class ChessHTMLParser(HTMLParser):
         self.skip_content = False  # Skip head, script, etc.
         self.current_tag = ""
         self.pending_newlines = 0
+        # (output index, image name, image path) of diagrams awaiting FEN
+        self.pending_diagrams = []
         
     def handle_starttag(self, tag, attrs):
+        self._end_data_run()
         attrs_dict = dict(attrs)
         self.current_tag = tag
         
@@ -161,12 +208,10 @@ class ChessHTMLParser(HTMLParser):
                 image_path = self.images_dir / image_name
                 
                 if image_path.exists():
-                    try:
-                        fen = image_to_fen(image_path, self.model)
-                        # Chesser format for Obsidian
-                        self.output.append(f"\n```chesser\nfen: {fen}\n```\n")
-                    except Exception as e:
-                        self.output.append(f"\n[Chess diagram: {image_name} - Error: {e}]\n")
+                    # Reserve a slot; all diagrams are classified together
+                    # in _render_diagrams once the document is parsed.
+                    self.pending_diagrams.append((len(self.output), image_name, image_path))
+                    self.output.append("")
                 else:
                     # Probably a photo, not a diagram
                     if "images/000" in src:
@@ -186,7 +231,7 @@ class ChessHTMLParser(HTMLParser):
             value = attrs_dict.get("value")
             if value:
                 self.list_counter = int(value)
-            self.current_text = f"{self.list_counter}. "
+            self.current_text = [f"{self.list_counter}. "]
         elif tag == "p":
             self._flush_text()
             class_name = attrs_dict.get("class", "")
@@ -202,6 +247,7 @@ class ChessHTMLParser(HTMLParser):
             self._flush_text()
     
     def handle_endtag(self, tag):
+        self._end_data_run()
         if tag in ("head", "script", "style"):
             self.skip_content = False
             return
@@ -216,14 +262,23 @@ class ChessHTMLParser(HTMLParser):
             self._flush_text()
             self.output.append("\n")
     
+    def handle_comment(self, data):
+        self._end_data_run()
+    
     def handle_data(self, data):
-        if self.skip_content:
+        self._data_run.append(data)
+    
+    def _end_data_run(self):
+        if not self._data_run:
             return
+        text = "".join(self._data_run)
+        self._data_run.clear()
         
-        text = data
+        if self.skip_content:
+            return
         
         # Clean up whitespace
-        text = re.sub(r'\s+', ' ', text)
+        text = _WS_RE.sub(' ', text)
         
         if not text.strip():
             return
@@ -234,36 +289,57 @@ class ChessHTMLParser(HTMLParser):
         if self.in_italic:
             text = f"*{text.strip()}*"
         
-        self.current_text += text
+        self.current_text.append(text)
     
     def _flush_text(self):
-        if self.current_text.strip():
+        text = "".join(self.current_text).strip()
+        if text:
             # Add pending newlines
             prefix = "\n" * self.pending_newlines
-            self.output.append(prefix + self.current_text.strip())
+            self.output.append(prefix + text)
             self.pending_newlines = 0
-        self.current_text = ""
+        self.current_text.clear()
+    
+    def _render_diagrams(self):
+        if not self.pending_diagrams:
+            return
+        paths = [image_path for _, _, image_path in self.pending_diagrams]
+        fens = images_to_fens(paths, self.model)
+        for (slot, image_name, _), fen in zip(self.pending_diagrams, fens):
+            if isinstance(fen, Exception):
+                self.output[slot] = f"\n[Chess diagram: {image_name} - Error: {fen}]\n"
+            else:
+                # Chesser format for Obsidian
+                self.output[slot] = f"\n```chesser\nfen: {fen}\n```\n"
+        self.pending_diagrams = []
     
     def get_markdown(self) -> str:
+        self._end_data_run()
         self._flush_text()
+        self._render_diagrams()
         result = "".join(self.output)
         # Clean up multiple newlines
-        result = re.sub(r'\n{3,}', '\n\n', result)
+        result = _NL_RE.sub('\n\n', result)
         return result.strip()
 
 
+# Characters of HTML read and parsed at a time.
+HTML_READ_CHUNK = 1 << 16
+
+
 def convert_html_to_markdown(html_path: Path, output_path: Path, model) -> None:
     """Convert an HTML file to markdown with Chesser diagrams."""
     
     # Find images directory
     images_dir = html_path.parent.parent / "images"
     
-    with open(html_path, "r", encoding="utf-8") as f:
-        html_content = f.read()
-    
-    # Parse and convert
+    # Parse and convert, feeding the file in chunks rather than reading
+    # it whole; HTMLParser buffers any tag split across two chunks.
     parser = ChessHTMLParser(images_dir, model)
-    parser.feed(html_content)
+    with open(html_path, "r", encoding="utf-8") as f:
+        while chunk := f.read(HTML_READ_CHUNK):
+            parser.feed(chunk)
+    parser.close()
     markdown = parser.get_markdown()
     
     # Write output
@@ -290,11 +366,15 @@ def main():
     else:
         output_path = SCRIPT_DIR / f"{html_path.stem}.md"
     
-    print("Loading model...")
-    model = load_model()
-    
     print(f"Converting: {html_path}")
-    convert_html_to_markdown(html_path, output_path, model)
+    try:
+        # Use the warm model of a running chess_model_server.py if there is one
+        chess_model_server.request("html", html_path, output_path)
+        print(f"Created: {output_path}")
+    except OSError:
+        print("Loading model...")
+        model = load_model()
+        convert_html_to_markdown(html_path, output_path, model)
 
 
 if __name__ == "__main__":
@@ -23,8 +23,9 @@ from the same kind of diagram (same font/style).
 
 This script:
 1. Splits the board image into an 8x8 grid.
-2. For each square, runs simple template matching to decide whether a
-   piece is present and which one.
+2. For each square, correlates its edges with every template (scaled
+   to the square's size) to decide whether a piece is present and
+   which one.
 3. Outputs a FEN string for the position.
 
 This is intentionally simple and tuned for static, consistent diagrams.
@@ -34,8 +35,9 @@ advanced CV / ML pipeline would be needed.
 
 from __future__ import annotations
 
+import functools
+import re
 import sys
-from dataclasses import dataclass
 from pathlib import Path
 from typing import Dict, Tuple, Optional
 
@@ -54,24 +56,62 @@ PIECE_FILES: Dict[str, str] = {
     "b": "bB.png",
     "r": "bR.png",
     "q": "bQ.png",
-    "k": "K.png",
+    "k": "bK.png",
 }
 
+# Pieces in the row order of template_bits, and the label for each
+# best-matching row; the extra last label (None) marks no match.
+PIECE_LETTERS: Tuple[str, ...] = tuple(PIECE_FILES)
+SQUARE_LABELS = np.array([*PIECE_LETTERS, None], dtype=object)
 
-@dataclass
-class Template:
-    piece: str  # FEN letter, e.g. "P", "k"
-    image: np.ndarray  # grayscale template
-    edges: np.ndarray  # edge-detected template
+# Squares with fewer edge pixels than this fraction of their area are
+# empty and are not matched against the templates.
+EMPTY_EDGE_FRACTION = 0.01
 
 
-def load_templates(templates_dir: Path) -> Dict[str, Template]:
+def read_gray(path: Path) -> Optional[np.ndarray]:
+    """
+    Read an image file as grayscale, or None if it can't be read or
+    decoded (like cv2.imread).
+
+    The bytes are read with numpy and decoded from memory, which also
+    works for non-ASCII paths on Windows.
+    """
+    try:
+        data = np.fromfile(path, dtype=np.uint8)
+    except OSError:
+        return None
+    if data.size == 0:
+        return None
+    return cv2.imdecode(data, cv2.IMREAD_GRAYSCALE)
+
+
+def load_templates(templates_dir: Path) -> np.ndarray:
     """
     Load piece templates from the provided directory.
 
-    Expects files named as in PIECE_FILES.
+    Expects files named as in PIECE_FILES. Returns the grayscale images
+    as one contiguous (12, H, W) uint8 array in PIECE_LETTERS order;
+    templates smaller than the largest one are scaled up to its size so
+    they stack. Edges are detected once they are scaled to the square
+    size (see template_bits).
+
+    The result is cached for the process and is read-only; it is only
+    reloaded when a template file is modified.
     """
-    templates: Dict[str, Template] = {}
+    mtimes = []
+    for filename in PIECE_FILES.values():
+        try:
+            mtimes.append((templates_dir / filename).stat().st_mtime_ns)
+        except OSError:
+            mtimes.append(None)  # reported by _load_templates
+    return _load_templates(Path(templates_dir).resolve(), tuple(mtimes))
+
+
+@functools.lru_cache(maxsize=8)
+def _load_templates(templates_dir: Path, mtimes: Tuple[Optional[int], ...]) -> np.ndarray:
+    """load_templates for one set of template file modification times."""
+    images = []
     for piece, filename in PIECE_FILES.items():
         path = templates_dir / filename
         if not path.exists():
@@ -79,79 +119,151 @@ def load_templates(templates_dir: Path) -> Dict[str, Template]:
                 f"Template for piece '{piece}' not found at {path}. "
                 f"Expected file {filename} in {templates_dir}"
             )
-        img_gray = cv2.imread(str(path), cv2.IMREAD_GRAYSCALE)
+        img_gray = read_gray(path)
         if img_gray is None:
             raise RuntimeError(f"Failed to read template image: {path}")
+        images.append(img_gray)
+
+    h = max(img.shape[0] for img in images)
+    w = max(img.shape[1] for img in images)
+    templates = np.empty((len(images), h, w), dtype=np.uint8)
+    for i, img_gray in enumerate(images):
+        if img_gray.shape != (h, w):
+            img_gray = cv2.resize(img_gray, (w, h), interpolation=cv2.INTER_CUBIC)
+        templates[i] = img_gray
+    templates.flags.writeable = False
+    return templates
 
-        # Normalize and compute edges to make matching less sensitive to
-        # light/dark square backgrounds.
-        img_blur = cv2.GaussianBlur(img_gray, (3, 3), 0)
-        img_edges = cv2.Canny(img_blur, 50, 150)
 
-        templates[piece] = Template(piece=piece, image=img_gray, edges=img_edges)
-    return templates
+def square_margins(h: int, w: int) -> Tuple[int, int]:
+    """(y, x) border trimmed off each side of an h x w square before matching."""
+    return max(1, h // 16), max(1, w // 16)
 
 
-def classify_square(
-    roi: np.ndarray,
-    templates: Dict[str, Template],
-    threshold: float = 0.5,
-) -> Optional[str]:
+def edge_map(gray: np.ndarray) -> np.ndarray:
     """
-    Classify a single square ROI as a piece or empty.
+    Edge-detect a grayscale image the same way as the templates.
 
-    Uses normalized cross-correlation template matching. Returns a FEN
-    piece letter (e.g. "P", "k") or None if no template matches well.
+    Matching works in edge space to reduce the impact of square color
+    and lighting; this helps especially for light (white) pieces.
+
+    Runs on the GPU when OpenCV was built with CUDA and a device is
+    available (see _cuda_edge_filters).
+    """
+    cuda_filters = _cuda_edge_filters()
+    if cuda_filters is not None:
+        blur, canny = cuda_filters
+        gpu_gray = cv2.cuda_GpuMat()
+        gpu_gray.upload(gray)
+        return canny.detect(blur.apply(gpu_gray)).download()
+    return cv2.Canny(cv2.GaussianBlur(gray, (3, 3), 0), 50, 150)
+
+
+@functools.lru_cache(maxsize=1)
+def _cuda_edge_filters():
+    """
+    CUDA (blur, Canny) filters equivalent to edge_map's CPU calls, created
+    once; None if OpenCV has no CUDA support (as with the pip wheels) or
+    no CUDA device is present.
     """
-    # Normalize ROI size a bit (optional small border to avoid edges)
-    h, w = roi.shape[:2]
-    margin_y = max(1, h // 16)
-    margin_x = max(1, w // 16)
-    roi_cropped = roi[margin_y : h - margin_y, margin_x : w - margin_x]
+    try:
+        if cv2.cuda.getCudaEnabledDeviceCount() == 0:
+            return None
+        return (
+            cv2.cuda.createGaussianFilter(cv2.CV_8UC1, cv2.CV_8UC1, (3, 3), 0),
+            cv2.cuda.createCannyEdgeDetector(50, 150),
+        )
+    except (AttributeError, cv2.error):
+        return None
 
-    roi_gray = cv2.cvtColor(roi_cropped, cv2.COLOR_BGR2GRAY) if roi_cropped.ndim == 3 else roi_cropped
 
-    # Work in edge space to reduce the impact of square color and
-    # lighting; this helps especially for light (white) pieces.
-    roi_blur = cv2.GaussianBlur(roi_gray, (3, 3), 0)
-    roi_edges = cv2.Canny(roi_blur, 50, 150)
+def pack_edges(edges: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pack (N, h, w) edge maps at 1 bit per pixel, as an (N, ceil(h*w / 64))
+    uint64 array, along with each map's count of edge pixels.
 
-    best_piece: Optional[str] = None
-    best_score: float = -1.0
+    Popcounts then run on 64-bit words, a byte-sized count per 64 pixels
+    instead of per 8.
+    """
+    bits = np.packbits(edges.reshape(len(edges), -1) >= 128, axis=1)
+    # Zero-pad each row to whole 64-bit words
+    padded = np.zeros((len(bits), -(-bits.shape[1] // 8) * 8), dtype=np.uint8)
+    padded[:, : bits.shape[1]] = bits
+    words = padded.view(np.uint64)
+    return words, np.bitwise_count(words).sum(axis=1, dtype=np.int64)
 
-    for piece, tmpl in templates.items():
-        tmpl_edges = tmpl.edges
-        th, tw = tmpl_edges.shape[:2]
 
-        # If the template is larger than the ROI (e.g. piece images are
-        # very zoomed in), downscale it to fit inside the ROI while
-        # keeping aspect ratio.
-        scale = min(roi_edges.shape[0] / th, roi_edges.shape[1] / tw)
-        if scale < 1.0:
-            new_size = (max(1, int(tw * scale)), max(1, int(th * scale)))
-            tmpl_edges = cv2.resize(tmpl_edges, new_size, interpolation=cv2.INTER_AREA)
+def template_bits(templates: np.ndarray, shape: Tuple[int, int]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Resize the (12, H, W) grayscale templates (see load_templates) to
+    `shape`, the margin-cropped square size, edge-detect them and pack
+    them (see pack_edges).
 
-        # If the (possibly resized) template is still too big in one
-        # dimension, skip it for this ROI.
-        th2, tw2 = tmpl_edges.shape[:2]
-        if th2 > roi_edges.shape[0] or tw2 > roi_edges.shape[1]:
-            continue
+    The edges are detected after resizing, as for the board itself:
+    shrinking a thin binary edge map averages its edges away.
+    """
+    h, w = shape
+    # One resize for all templates, as the channels of an (H, W, 12) image
+    resized = cv2.resize(
+        np.ascontiguousarray(templates.transpose(1, 2, 0)), (w, h), interpolation=cv2.INTER_AREA
+    ).reshape(h, w, -1)
+    edges = np.stack([edge_map(np.ascontiguousarray(resized[:, :, i])) for i in range(len(templates))])
+    return pack_edges(edges)
+
+
+def edge_correlation(
+    rois: Tuple[np.ndarray, np.ndarray],
+    templates: Tuple[np.ndarray, np.ndarray],
+    size: int,
+) -> np.ndarray:
+    """
+    Normalized cross-correlation of every packed ROI with every packed
+    template (see pack_edges), as an (N, 12) array; `size` is the number
+    of pixels in each.
 
-        res = cv2.matchTemplate(roi_edges, tmpl_edges, cv2.TM_CCOEFF_NORMED)
-        min_val, max_val, _, _ = cv2.minMaxLoc(res)
-        if max_val > best_score:
-            best_score = max_val
-            best_piece = piece
+    For binary images the correlation only depends on how many edge
+    pixels each has and how many they share, so it comes down to AND and
+    popcount on the packed bits. Flat (e.g. empty) ROIs score 0.
+    """
+    roi_bits, roi_counts = rois
+    tmpl_bits, tmpl_counts = templates
+    shared = np.bitwise_count(roi_bits[:, None, :] & tmpl_bits[None, :, :]).sum(
+        axis=2, dtype=np.int64
+    )
+    a = roi_counts[:, None]
+    b = tmpl_counts[None, :]
+    numerator = size * shared - a * b
+    denominator = np.sqrt((a * (size - a) * (b * (size - b))).astype(np.float64))
+    return np.divide(
+        numerator, denominator, out=np.zeros(numerator.shape), where=denominator > 0
+    )
+
+
+def classify_square_edges(
+    roi_edges: np.ndarray,
+    templates: Tuple[np.ndarray, np.ndarray],
+    threshold: float = 0.5,
+) -> Optional[str]:
+    """
+    Classify a single square as a piece or empty, from its margin-cropped
+    edge map (see square_margins and edge_map) and the template_bits for
+    its size.
+
+    Returns a FEN piece letter (e.g. "P", "k") or None if no template
+    matches well.
+    """
+    scores = edge_correlation(pack_edges(roi_edges[None]), templates, roi_edges.size)[0]
+    best = int(np.argmax(scores))
 
     # Apply the presence threshold after we've found the best match.
-    if best_score >= threshold:
-        return best_piece
+    if scores[best] >= threshold:
+        return PIECE_LETTERS[best]
     return None
 
 
 def image_to_board(
     image_path: Path,
-    templates: Dict[str, Template],
+    templates: np.ndarray,
     threshold: float = 0.5,
 ) -> list[list[Optional[str]]]:
     """
@@ -161,29 +273,50 @@ def image_to_board(
     Returns a list of 8 ranks (from top to bottom), each a list of 8
     squares (from left to right).
     """
-    img = cv2.imread(str(image_path))
-    if img is None:
+    # Decode straight to grayscale, without a BGR copy of the board
+    gray = read_gray(image_path)
+    if gray is None:
         raise RuntimeError(f"Failed to read image: {image_path}")
 
-    h, w = img.shape[:2]
-    square_h = h // 8
-    square_w = w // 8
-
-    board: list[list[Optional[str]]] = []
+    # Square boundaries on the image as it is; when its size isn't a
+    # multiple of 8 some squares are a pixel larger than others. Every
+    # square is matched on an ROI of the same size, centred in it.
+    h, w = gray.shape
+    ys = np.linspace(0, h, 9).astype(int)
+    xs = np.linspace(0, w, 9).astype(int)
+    square_h, square_w = int(np.diff(ys).min()), int(np.diff(xs).min())
+    margin_y, margin_x = square_margins(square_h, square_w)
+    roi_h, roi_w = square_h - 2 * margin_y, square_w - 2 * margin_x
+    rows = (ys[:-1] + (np.diff(ys) - roi_h) // 2)[:, None] + np.arange(roi_h)
+    cols = (xs[:-1] + (np.diff(xs) - roi_w) // 2)[:, None] + np.arange(roi_w)
+
+    # Edge-detect the whole board once and gather the 64 ROIs
+    # (row-major from a8) with one indexing op
+    edges = edge_map(gray)
+    squares = edges[rows[:, None, :, None], cols[None, :, None, :]]
+
+    # Pack the edge maps to 1 bit per pixel; squares with almost no
+    # edges are empty and skip matching
+    roi_bits, roi_counts = pack_edges(squares.reshape(64, roi_h, roi_w))
+    busy = np.flatnonzero(roi_counts >= EMPTY_EDGE_FRACTION * roi_h * roi_w)
+    labels = np.full(64, len(PIECE_LETTERS))
+
+    if len(busy):
+        # Correlate every remaining square with every template at once
+        scores = edge_correlation(
+            (roi_bits[busy], roi_counts[busy]),
+            template_bits(templates, (roi_h, roi_w)),
+            roi_h * roi_w,
+        )  # (len(busy), num_templates)
+        best = scores.argmax(axis=1)
+        present = scores[np.arange(len(busy)), best] >= threshold
+        labels[busy[present]] = best[present]
+
+    board: list[list[Optional[str]]] = SQUARE_LABELS[labels].reshape(8, 8).tolist()
+    return board
 
-    for rank_idx in range(8):  # 0 = top rank (Black side)
-        rank: list[Optional[str]] = []
-        y0 = rank_idx * square_h
-        y1 = (rank_idx + 1) * square_h if rank_idx < 7 else h
-        for file_idx in range(8):  # 0 = a-file (left)
-            x0 = file_idx * square_w
-            x1 = (file_idx + 1) * square_w if file_idx < 7 else w
-            roi = img[y0:y1, x0:x1]
-            piece = classify_square(roi, templates, threshold=threshold)
-            rank.append(piece)
-        board.append(rank)
 
-    return board
+_EMPTY_RUN_RE = re.compile(r"1+")
 
 
 def board_to_fen(board: list[list[Optional[str]]]) -> str:
@@ -191,22 +324,10 @@ def board_to_fen(board: list[list[Optional[str]]]) -> str:
     Convert a board array (top rank first) to a FEN piece placement
     string (no side-to-move / castling info).
     """
-    fen_ranks = []
-    for rank in board:
-        empty_run = 0
-        parts = []
-        for sq in rank:
-            if sq is None:
-                empty_run += 1
-            else:
-                if empty_run > 0:
-                    parts.append(str(empty_run))
-                    empty_run = 0
-                parts.append(sq)
-        if empty_run > 0:
-            parts.append(str(empty_run))
-        fen_ranks.append("".join(parts) or "8")
-    return "/".join(fen_ranks)
+    # Write every empty square as "1", then let one regex pass collapse
+    # each run of them into its length
+    placement = "/".join("".join(sq or "1" for sq in rank) for rank in board)
+    return _EMPTY_RUN_RE.sub(lambda run: str(len(run.group())), placement)
 
 
 def main(argv: list[str]) -> None:
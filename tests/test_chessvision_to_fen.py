@@ -0,0 +1,32 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("tensorflow")
+pytest.importorskip("PIL")
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import chessvision_to_fen  # noqa: E402
+
+
+class NoModel:
+    """Fails the test if a square reaches the model."""
+
+    def __call__(self, *args, **kwargs):
+        raise AssertionError("blank squares should not be classified")
+
+
+def test_classify_squares_skips_flat_coloured_squares():
+    h, w = chessvision_to_fen.img_height, chessvision_to_fen.img_width
+    # Dark and light squares of a green board
+    batch = np.empty((2, h, w, 3), dtype=np.uint8)
+    batch[0] = (118, 150, 86)
+    batch[1] = (238, 238, 210)
+
+    predictions = chessvision_to_fen.classify_squares(batch, NoModel())
+
+    assert (predictions.argmax(axis=1) == chessvision_to_fen.EMPTY_IDX).all()
@@ -0,0 +1,75 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import image_to_fen  # noqa: E402
+
+TEMPLATES_DIR = ROOT / "piece_images"
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR"
+
+
+def render_diagram(fen: str, path: Path, size: int = 8 * 48) -> Path:
+    """
+    Draw `fen` as a white size x size diagram with the piece templates
+    centred in their squares, which are a pixel larger than others when
+    size isn't a multiple of 8.
+    """
+    templates = image_to_fen.load_templates(TEMPLATES_DIR)
+    bounds = np.linspace(0, size, 9).astype(int)
+    square = int(np.diff(bounds).min())
+    margin_y, margin_x = image_to_fen.square_margins(square, square)
+    roi_h, roi_w = square - 2 * margin_y, square - 2 * margin_x
+
+    board = np.full((size, size), 255, dtype=np.uint8)
+    for rank_idx, rank in enumerate(fen.split("/")):
+        file_idx = 0
+        for code in rank:
+            if code.isdigit():
+                file_idx += int(code)
+                continue
+            piece = cv2.resize(
+                templates[image_to_fen.PIECE_LETTERS.index(code)],
+                (roi_w, roi_h),
+                interpolation=cv2.INTER_AREA,
+            )
+            y0 = bounds[rank_idx] + (bounds[rank_idx + 1] - bounds[rank_idx] - roi_h) // 2
+            x0 = bounds[file_idx] + (bounds[file_idx + 1] - bounds[file_idx] - roi_w) // 2
+            board[y0 : y0 + roi_h, x0 : x0 + roi_w] = piece
+            file_idx += 1
+
+    cv2.imwrite(str(path), board)
+    return path
+
+
+def test_image_to_board_round_trips_a_diagram(tmp_path):
+    path = render_diagram(START_FEN, tmp_path / "start.png")
+    templates = image_to_fen.load_templates(TEMPLATES_DIR)
+
+    board = image_to_fen.image_to_board(path, templates, threshold=0.55)
+
+    assert image_to_fen.board_to_fen(board) == START_FEN
+
+
+def test_image_to_board_empty_diagram(tmp_path):
+    path = render_diagram("8/8/8/8/8/8/8/8", tmp_path / "empty.png")
+    templates = image_to_fen.load_templates(TEMPLATES_DIR)
+
+    board = image_to_fen.image_to_board(path, templates, threshold=0.55)
+
+    assert board == [[None] * 8 for _ in range(8)]
+
+
+def test_image_to_board_size_not_a_multiple_of_8(tmp_path):
+    path = render_diagram(START_FEN, tmp_path / "start.png", size=8 * 48 + 5)
+    templates = image_to_fen.load_templates(TEMPLATES_DIR)
+
+    board = image_to_fen.image_to_board(path, templates, threshold=0.55)
+
+    assert image_to_fen.board_to_fen(board) == START_FEN